@@ -1,3 +1,8 @@
+import time
+
+_import_start = time.perf_counter()
+
+import bpy
 from .modules import curve_edges
 from .modules import normal_symmetrize
 from .modules import select_edge_loop
@@ -6,15 +11,20 @@ from .modules import edge_length
 from .modules import origin
 from .modules import group_merge
 
+from . import cache
 from . import main_ui
 from . import translation
 from . import icons
 from . import keymaps
 from . import preferences
+from .globals import load_timings
+
+load_timings["import"] = time.perf_counter() - _import_start
 
 
 module_list = [
     preferences,
+    cache,
     select_edge_loop,
     select_trait,
     curve_edges,
@@ -29,8 +39,15 @@ module_list = [
 ]
 
 def register():
+    start = time.perf_counter()
     for module in module_list:
         module.register()
+    load_timings["register"] = time.perf_counter() - start
+
+    if bpy.app.debug:
+        print("Mio3 Mesh Tools: import {:.1f} ms, register {:.1f} ms".format(
+            load_timings["import"] * 1000, load_timings["register"] * 1000
+        ))
 
 
 def unregister():
@@ -0,0 +1,104 @@
+"""ベンチマーク用のメッシュを生成する (すべてX軸で左右対称)"""
+
+import math
+import bpy
+import numpy as np
+
+
+def get_grid(num_verts):
+    """XY平面の格子"""
+    n = max(2, round(math.sqrt(num_verts)))
+    x, y = np.meshgrid(np.linspace(-1.0, 1.0, n), np.linspace(-1.0, 1.0, n))
+    co = np.stack([x.ravel(), y.ravel(), np.zeros(n * n)], axis=1)
+    index = np.arange(n * n).reshape(n, n)
+    faces = np.stack([index[:-1, :-1], index[:-1, 1:], index[1:, 1:], index[1:, :-1]], axis=-1)
+    return co, faces.reshape(-1, 4)
+
+
+def get_ring_faces(num_rings, ring_size, closed_rings=True):
+    """リングを順につないだ四角形の面 (頂点番号は ring * ring_size + j)"""
+    index = np.arange(num_rings * ring_size).reshape(num_rings, ring_size)
+    next_ring = np.roll(index, -1, axis=0) if closed_rings else index[1:]
+    index = index if closed_rings else index[:-1]
+    faces = np.stack([index, np.roll(index, -1, axis=1), np.roll(next_ring, -1, axis=1), next_ring], axis=-1)
+    return faces.reshape(-1, 4)
+
+
+def get_torus(num_verts, major_radius=1.0, minor_radius=0.3):
+    """Z軸まわりのトーラス (チューブを一周するリングがエッジループになる)"""
+    ring_size = max(4, round(math.sqrt(num_verts / 4)) // 2 * 2)
+    num_rings = max(4, num_verts // ring_size // 2 * 2)
+    phi = np.linspace(0.0, 2 * np.pi, num_rings, endpoint=False)[:, None]
+    theta = np.linspace(0.0, 2 * np.pi, ring_size, endpoint=False)[None, :]
+    radius = np.broadcast_to(major_radius + minor_radius * np.cos(theta), (num_rings, ring_size))
+    co = np.stack(
+        [
+            (radius * np.cos(phi)).ravel(),
+            (radius * np.sin(phi)).ravel(),
+            np.broadcast_to(minor_radius * np.sin(theta), radius.shape).ravel(),
+        ],
+        axis=1,
+    )
+    return co, get_ring_faces(num_rings, ring_size), ring_size
+
+
+def get_character(num_verts):
+    """胴体のように太さが変わる筒 (水平のリングがエッジループになる)"""
+    ring_size = max(8, round(math.sqrt(num_verts)) // 2 * 2)
+    num_rings = max(2, num_verts // ring_size)
+    z = np.linspace(0.0, 1.8, num_rings)[:, None]
+    theta = np.linspace(0.0, 2 * np.pi, ring_size, endpoint=False)[None, :]
+    # 胸・腰・脚の太さと前後の扁平さ (cos 2θ はX軸の反転で変わらない)
+    profile = 0.15 + 0.05 * np.sin(z * 5.0) + 0.04 * np.cos(z * 11.0)
+    radius = profile * (1.0 + 0.25 * np.cos(2 * theta))
+    co = np.stack(
+        [
+            (radius * np.cos(theta)).ravel(),
+            (radius * np.sin(theta)).ravel(),
+            np.broadcast_to(z, radius.shape).ravel(),
+        ],
+        axis=1,
+    )
+    return co, get_ring_faces(num_rings, ring_size, closed_rings=False), ring_size
+
+
+def create_object(name, co, faces):
+    """頂点と四角形の面の配列からメッシュオブジェクトを作成する"""
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(co))
+    mesh.vertices.foreach_set("co", co.astype(np.float32).ravel())
+    mesh.loops.add(faces.size)
+    mesh.loops.foreach_set("vertex_index", faces.astype(np.int32).ravel())
+    mesh.polygons.add(len(faces))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, faces.size, 4, dtype=np.int32))
+    mesh.update(calc_edges=True)
+
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    return obj
+
+
+def set_custom_normals(mesh, seed=0):
+    """頂点ノーマルを少し乱したカスタムノーマルを設定する"""
+    normals = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertex_normals.foreach_get("vector", normals)
+    normals = normals.reshape(-1, 3) + np.random.default_rng(seed).normal(0.0, 0.2, (len(mesh.vertices), 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    mesh.normals_split_custom_set_from_vertices(normals.tolist())
+
+
+def set_vert_select(mesh, vert_select, select_faces=False):
+    """頂点の選択を書き込み、両端が選択された辺も選択する (select_faces なら全頂点が選択された面も選択する)"""
+    mesh.vertices.foreach_set("select", vert_select)
+    edge_verts = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edge_verts)
+    mesh.edges.foreach_set("select", vert_select[edge_verts.reshape(-1, 2)].all(axis=1))
+
+    face_select = np.zeros(len(mesh.polygons), dtype=bool)
+    if select_faces and len(mesh.polygons):
+        loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_verts)
+        loop_start = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_start", loop_start)
+        face_select = np.logical_and.reduceat(vert_select[loop_verts], loop_start)
+    mesh.polygons.foreach_set("select", face_select)
@@ -0,0 +1,364 @@
+"""生成したメッシュでオペレーターの処理時間を計測する
+
+Usage:
+    blender -b --factory-startup --python benchmarks/run.py -- [options]
+    python benchmarks/run.py [options]    (bpyモジュール)
+
+Options:
+    --sizes 10k,100k,1m   頂点数
+    --cases a,b           実行するケース (省略するとすべて)
+    --repeat N            繰り返して最短の時間を記録する
+    --output PATH         結果をJSONで書き出す
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import bpy
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), "tools"))
+
+import meshes  # noqa: E402
+from batch import ensure_registered  # noqa: E402
+
+
+def select_ring(info, ring=1):
+    num_verts, ring_size = info["num_verts"], info["ring_size"]
+    select = np.zeros(num_verts, dtype=bool)
+    select[ring * ring_size : (ring + 1) * ring_size] = True
+    return select
+
+
+def select_edge(info, ring=1):
+    select = np.zeros(info["num_verts"], dtype=bool)
+    select[ring * info["ring_size"] : ring * info["ring_size"] + 2] = True
+    return select
+
+
+def select_two_rings(info):
+    num_rings = info["num_verts"] // info["ring_size"]
+    return select_ring(info, 1) | select_ring(info, num_rings // 2)
+
+
+def select_band(info):
+    """2つのリングにはさまれた帯 (境界が2つに分かれる)"""
+    num_rings = info["num_verts"] // info["ring_size"]
+    select = np.zeros(info["num_verts"], dtype=bool)
+    select[info["ring_size"] : (num_rings // 2) * info["ring_size"]] = True
+    return select
+
+
+def select_corner_face(info):
+    """格子の角の面"""
+    co = info["co"]
+    n = round(np.sqrt(info["num_verts"]))
+    return (co[:, :2] <= co[:, :2].min(axis=0) + 2.0 / (n - 1) * 1.01).all(axis=1)
+
+
+def check_between(mesh, info):
+    """選択した2つのループとその間のループの辺だけが選択されているか (閉じたリングでは反対側を含まない)"""
+    ring_size = info["ring_size"]
+    last = info["num_verts"] // ring_size // 2
+    edge_verts = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edge_verts)
+    rings = edge_verts.reshape(-1, 2) // ring_size
+    select = np.empty(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get("select", select)
+    expected = (rings[:, 0] == rings[:, 1]) & (rings[:, 0] >= 1) & (rings[:, 0] <= last)
+    if not np.array_equal(select, expected):
+        return "{} edges selected, expected {}".format(np.count_nonzero(select), np.count_nonzero(expected))
+    return None
+
+
+def select_positive_half(info):
+    return info["co"][:, 0] > 1e-6
+
+
+def select_all(info):
+    return np.ones(info["num_verts"], dtype=bool)
+
+
+def select_none(info):
+    return np.zeros(info["num_verts"], dtype=bool)
+
+
+# mesh: 使うメッシュ, select: 実行前の選択, select_faces: 面も選択する, check: 結果の確認 (問題があればメッセージを返す)
+# calls: 同じメッシュで続けて実行する回数, expect_cache_hit: 2回目以降にトポロジーのキャッシュが使われるか確認する
+# builtin: 比較するBlender標準のオペレーター
+CASES = {
+    "select_mirror": {
+        "mesh": "torus",
+        "select": select_positive_half,
+        "op": ("mesh.mio3_select_mirror", {"extend": True}),
+        "builtin": ("mesh.select_mirror", {"axis": {"X"}, "extend": True}),
+    },
+    "select_edge_loops": {
+        "mesh": "torus",
+        "select_mode": (False, True, False),
+        "select": select_edge,
+        "op": ("mesh.mio3_select_edges", {"ring": False, "mode": "MORE", "steps": 100}),
+        "builtin": ("mesh.loop_multi_select", {"ring": False}),
+    },
+    "select_edge_rings": {
+        "mesh": "torus",
+        "select_mode": (False, True, False),
+        "select": select_edge,
+        "op": ("mesh.mio3_select_edges", {"ring": True, "mode": "MORE", "steps": 100}),
+        "builtin": ("mesh.loop_multi_select", {"ring": True}),
+    },
+    "select_between": {
+        "mesh": "torus",
+        "select_mode": (False, True, False),
+        "select": select_two_rings,
+        "check": check_between,
+        "op": ("mesh.mio3_select_between", {}),
+    },
+    "select_between_grid": {
+        "mesh": "grid",
+        "select_mode": (False, True, False),
+        "select": select_two_rings,
+        "check": check_between,
+        "op": ("mesh.mio3_select_between", {}),
+    },
+    "select_edge_filter": {
+        "mesh": "torus",
+        "select_mode": (False, True, False),
+        "select": select_all,
+        "op": ("mesh.mio3_select_edge_filter", {"axis": {"X", "Y"}}),
+    },
+    "select_edge_vector": {
+        "mesh": "character",
+        "select_mode": (False, False, True),
+        "select": select_band,
+        "select_faces": True,
+        "op": ("mesh.mio3_select_edge_vector", {"bone_type": "BOUNDARY"}),
+    },
+    "select_flat": {
+        "mesh": "grid",
+        "select_mode": (False, False, True),
+        "select": select_corner_face,
+        "select_faces": True,
+        "op": ("mesh.mio3_select_flat", {}),
+        "builtin": ("mesh.faces_select_linked_flat", {}),
+    },
+    "select_edge_loops_twice": {
+        "mesh": "torus",
+        "select_mode": (False, True, False),
+        "select": select_edge,
+        "calls": 2,
+        "expect_cache_hit": True,
+        "op": ("mesh.mio3_select_edges", {"ring": False, "mode": "MORE", "steps": 1}),
+    },
+    "select_half": {
+        "mesh": "character",
+        "select": select_none,
+        "op": ("mesh.mio3_select_half", {}),
+    },
+    "select_center": {
+        "mesh": "character",
+        "select": select_none,
+        "op": ("mesh.mio3_select_center", {}),
+    },
+    "normal_symmetrize": {
+        "mesh": "character",
+        "select": select_all,
+        "op": ("mesh.mio3_normal_symmetrize", {"axis": "POSITIVE_X"}),
+    },
+    "normal_symmetrize_topology": {
+        "mesh": "character",
+        "mirror_topology": True,
+        "select": select_all,
+        "op": ("mesh.mio3_normal_symmetrize", {"axis": "POSITIVE_X"}),
+    },
+    "edge_length": {
+        "mesh": "torus",
+        "mirror": True,
+        "select": select_ring,
+        "op": ("mesh.mio3_edge_length", {}),
+    },
+    "group_merge": {
+        "mesh": "torus",
+        "mirror": True,
+        "select": select_ring,
+        "op": ("mesh.mio3_group_merg", {"marge_size": 2}),
+    },
+    "curve_edges": {
+        "mesh": "torus",
+        "mirror": True,
+        "select": select_ring,
+        "op": ("mesh.mio3_curve_edges_quick", {"iterations": 1}),
+    },
+    "origin_to_active": {
+        "mesh": "grid",
+        "select": select_positive_half,
+        "op": ("mesh.mio3_origin_to_active", {}),
+    },
+}
+
+
+def get_addon_package():
+    """登録されているオペレーターのモジュールからアドオンのパッケージ名を取得する"""
+    module = sys.modules[bpy.types.MESH_OT_mio3_normal_symmetrize.__module__]
+    return module.__package__.rpartition(".")[0]
+
+
+def get_update_stats():
+    """アドオンの update_edit_mesh の累計 (時間, 回数) を取得する"""
+    return sys.modules[get_addon_package() + ".utils"]._update_stats
+
+
+def get_cache_stats():
+    """アドオンのトポロジーのキャッシュの累計 (ヒット, ミス) を取得する"""
+    return sys.modules[get_addon_package() + ".cache"].topology_cache_stats
+
+
+def get_operator(idname):
+    category, name = idname.split(".")
+    return getattr(getattr(bpy.ops, category), name)
+
+
+def create_case_object(case, size):
+    """ケースのメッシュを作成して選択を設定し、エディットモードにする"""
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj)
+    for mesh in list(bpy.data.meshes):
+        bpy.data.meshes.remove(mesh)
+
+    kind = case["mesh"]
+    if kind == "grid":
+        co, faces = meshes.get_grid(size)
+        # 格子の行をリングとして扱う
+        ring_size = round(np.sqrt(len(co)))
+    elif kind == "torus":
+        co, faces, ring_size = meshes.get_torus(size)
+    else:
+        co, faces, ring_size = meshes.get_character(size)
+
+    obj = meshes.create_object(kind, co, faces)
+    mesh = obj.data
+    if kind == "character":
+        meshes.set_custom_normals(mesh)
+    mesh.use_mirror_x = case.get("mirror", False)
+    mesh.use_mirror_topology = case.get("mirror_topology", False)
+    info = {"co": co, "num_verts": len(co), "ring_size": ring_size}
+    meshes.set_vert_select(mesh, case["select"](info), case.get("select_faces", False))
+
+    view_layer = bpy.context.view_layer
+    view_layer.objects.active = obj
+    obj.select_set(True)
+    bpy.context.tool_settings.mesh_select_mode = case.get("select_mode", (True, False, False))
+    bpy.ops.object.mode_set(mode="EDIT")
+    return obj, info
+
+
+def time_operator(case, size, idname, params, repeat, check=None):
+    best = None
+    for _ in range(repeat):
+        obj, info = create_case_object(case, size)
+        stats = get_update_stats()
+        update_time, update_count = stats
+        cache_stats = get_cache_stats()
+        cache_hits, cache_misses = cache_stats
+        times = []
+        for _ in range(case.get("calls", 1)):
+            start = time.perf_counter()
+            result = get_operator(idname)("EXEC_DEFAULT", **params)
+            times.append(time.perf_counter() - start)
+        record = {
+            "op": idname,
+            "result": sorted(result),
+            "time": times[0],
+            "update_time": stats[0] - update_time,
+            "update_count": stats[1] - update_count,
+            "cache_hits": cache_stats[0] - cache_hits,
+            "cache_misses": cache_stats[1] - cache_misses,
+            "verts": len(obj.data.vertices),
+        }
+        if len(times) > 1:
+            record["repeat_times"] = times[1:]
+        bpy.ops.object.mode_set(mode="OBJECT")
+        if check and (message := check(obj.data, info)):
+            raise RuntimeError("Check failed: {}".format(message))
+        if best is None or record["time"] < best["time"]:
+            best = record
+    return best
+
+
+def run_case(name, size, repeat):
+    case = CASES[name]
+    op_name, params = case["op"]
+    record = {"case": name, "mesh": case["mesh"], "size": size}
+    record.update(time_operator(case, size, op_name, params, repeat, case.get("check")))
+    # 続けて実行したときに、2回目以降はトポロジーを作り直さない
+    if case.get("expect_cache_hit") and record["cache_hits"] < case["calls"] - 1:
+        raise RuntimeError("Topology cache missed: {} hits in {} calls".format(record["cache_hits"], case["calls"]))
+    if builtin := case.get("builtin"):
+        builtin_record = time_operator(case, size, *builtin, repeat)
+        record["builtin"] = {key: builtin_record[key] for key in ("op", "result", "time")}
+    return record
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark Mio3 Mesh Tools operators on generated meshes")
+    parser.add_argument("--sizes", default="10k,100k,1m", help="Vertex counts (e.g. 10k,100k,1m)")
+    parser.add_argument("--cases", help="Comma separated case names: " + ", ".join(CASES))
+    parser.add_argument("--repeat", type=int, default=1, help="Keep the fastest of N runs")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    names = args.cases.split(",") if args.cases else list(CASES)
+    for name in names:
+        if name not in CASES:
+            parser.error("Unknown case: {}".format(name))
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    ensure_registered()
+
+    results = []
+    for size in sizes:
+        for name in names:
+            try:
+                record = run_case(name, size, max(1, args.repeat))
+            except Exception as e:
+                record = {"case": name, "size": size, "error": "{}: {}".format(type(e).__name__, e)}
+            results.append(record)
+
+            if "error" in record:
+                print("{:<28} {:>9,} FAILED {}".format(name, size, record["error"]), flush=True)
+                continue
+            line = "{:<28} {:>9,} {:>10.1f} ms  update {:>3} ({:.1f} ms)".format(
+                name, record["verts"], record["time"] * 1000, record["update_count"], record["update_time"] * 1000
+            )
+            if repeat_times := record.get("repeat_times"):
+                line += "  then {} ms (cache {} hit, {} miss)".format(
+                    ", ".join("{:.1f}".format(t * 1000) for t in repeat_times), record["cache_hits"], record["cache_misses"]
+                )
+            if builtin := record.get("builtin"):
+                line += "  {} {:.1f} ms".format(builtin["op"], builtin["time"] * 1000)
+            print(line, flush=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"blender": bpy.app.version_string, "results": results}, f, indent=2)
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    # Blenderから実行されたときは "--" 以降が引数
+    if "--" in sys.argv:
+        argv = sys.argv[sys.argv.index("--") + 1 :]
+    sys.exit(main(argv))
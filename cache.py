@@ -0,0 +1,78 @@
+import bpy
+from bpy.app.handlers import persistent
+from .mirror import clear_mirror_cache, get_topology_fingerprint
+from .utils import MeshTopology, get_vert_co_array, transform_points
+from .globals import lazy_import
+
+np = lazy_import("numpy")
+
+# {object session_uid: (mesh session_uid, matrix_world, world_co)}
+_world_co_cache = {}
+# {mesh session_uid: (topology fingerprint, MeshTopology)}
+_topology_cache = {}
+# トポロジーのキャッシュの [ヒット, ミス] の累計
+topology_cache_stats = [0, 0]
+
+
+def get_world_co(obj):
+    """頂点のワールド座標を取得する（メッシュか変形が変わるまでキャッシュ）"""
+    mesh = obj.data
+    matrix = np.array(obj.matrix_world, dtype=np.float64)
+    cached = _world_co_cache.get(obj.session_uid)
+    if cached is not None:
+        mesh_uid, cached_matrix, world_co = cached
+        if mesh_uid == mesh.session_uid and len(world_co) == len(mesh.vertices) and np.array_equal(cached_matrix, matrix):
+            return world_co
+
+    world_co = transform_points(matrix, get_vert_co_array(mesh).astype(np.float64))
+    _world_co_cache[obj.session_uid] = (mesh.session_uid, matrix, world_co)
+    return world_co
+
+
+def get_mesh_topology(mesh):
+    """メッシュの接続情報を取得する（トポロジーが変わるまで、計算済みの表ごとキャッシュ）"""
+    topo = MeshTopology(mesh)
+    fingerprint = get_topology_fingerprint(topo)
+    cached = _topology_cache.get(mesh.session_uid)
+    if cached is not None and cached[0] == fingerprint:
+        topology_cache_stats[0] += 1
+        return cached[1]
+
+    topology_cache_stats[1] += 1
+    _topology_cache[mesh.session_uid] = (fingerprint, topo)
+    return topo
+
+
+def clear_cache():
+    _world_co_cache.clear()
+    _topology_cache.clear()
+    clear_mirror_cache()
+
+
+@persistent
+def depsgraph_update_post(scene, depsgraph):
+    if not _world_co_cache:
+        return
+    for update in depsgraph.updates:
+        if not update.is_updated_geometry:
+            continue
+        uid = update.id.original.session_uid
+        for key, (mesh_uid, _, _) in list(_world_co_cache.items()):
+            if key == uid or mesh_uid == uid:
+                del _world_co_cache[key]
+
+
+@persistent
+def load_post(*args):
+    clear_cache()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(depsgraph_update_post)
+    bpy.app.handlers.load_post.append(load_post)
+
+
+def unregister():
+    bpy.app.handlers.depsgraph_update_post.remove(depsgraph_update_post)
+    bpy.app.handlers.load_post.remove(load_post)
+    clear_cache()
@@ -1,5 +1,10 @@
+import sys
+import importlib
 import bpy
 
+# アドオンの読み込み時間 (秒)
+load_timings = {}
+
 
 def get_preference_idname():
     return __package__
@@ -11,3 +16,24 @@ def get_preferences():
 
 def get_preference(name):
     return getattr(get_preferences(), name, None)
+
+
+class LazyModule:
+    """属性に初めてアクセスしたときにモジュールを読み込む (sys.modules には実際のモジュールだけが登録される)"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """読み込み済みならそのモジュールを、まだならアドオン内だけで使う遅延読み込みのモジュールを取得する"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
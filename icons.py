@@ -26,7 +26,14 @@ icon_names = [
 class IconSet:
     def __init__(self):
         self._icons = None
-    
+
+    def __getattr__(self, name):
+        # 初めてパネルを描画したときに読み込む
+        if name in icon_names and self._icons is None:
+            self.load()
+            return getattr(self, name)
+        raise AttributeError(name)
+
     def load(self):
         self._icons = previews.new()
         for name in icon_names:
@@ -39,13 +46,15 @@ class IconSet:
         if self._icons:
             previews.remove(self._icons)
             self._icons = None
+            for name in icon_names:
+                self.__dict__.pop(name, None)
 
 
 icons = IconSet()
 
 
 def register():
-    icons.load()
+    pass
 
 
 def unregister():
@@ -1,8 +1,9 @@
 import bpy
 from bpy.types import Panel, Menu, PropertyGroup
-from bpy.props import BoolProperty, IntProperty, PointerProperty
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty, PointerProperty
 from .icons import icons
-from .utils import is_local_obj
+from bpy.app.translations import pgettext_iface as tt_iface
+from .utils import is_local_obj, operator_history
 
 
 class MIO3_PT_mesh_tools(Panel):
@@ -76,10 +77,87 @@ class MIO3_PT_curve_edge_loop(Panel):
         split = col.split(factor=0.55, align=True)
         split.label(text="Control Points", icon="HANDLE_ALIGNED")
         split.prop(context.window_manager.mio3ce, "control_num", text="")
+        col.row(align=True).prop(context.window_manager.mio3ce, "control_mode", expand=True)
+        col.row(align=True).prop(context.window_manager.mio3ce, "placement", expand=True)
+        split = col.split(factor=0.55, align=True)
+        split.label(text="Falloff", icon="SMOOTHCURVE")
+        split.prop(context.window_manager.mio3ce, "falloff_radius", text="")
+        split = col.split(factor=0.55, align=True)
+        split.label(text="Snap Target", icon="SNAP_FACE")
+        split.prop(context.window_manager.mio3ce, "snap_target", text="")
+        col.prop(context.window_manager.mio3ce, "restore_spline")
+
+
+class MIO3_PT_performance(Panel):
+    bl_label = "Performance"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Mio3"
+    bl_parent_id = "MIO3_PT_mesh_tools"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        if not operator_history:
+            layout.label(text="No history")
+            return
+
+        for entries in operator_history.values():
+            col = layout.box().column(align=True)
+            col.label(text=tt_iface(entries[-1]["label"], "Operator"), icon="TIME")
+            for entry in reversed(entries):
+                row = col.row(align=True)
+                row.label(text="{:.1f} ms".format(entry["time"] * 1000))
+                row.label(
+                    text="{}: {:.1f} ms ({})".format(
+                        tt_iface("Update"), entry["update_time"] * 1000, entry["update_count"]
+                    )
+                )
+                if entry["counts"]:
+                    col.label(text="V {:,}  E {:,}  F {:,}".format(*entry["counts"]))
+
+
+def poll_snap_target(self, obj):
+    return obj.type == "MESH"
 
 
 class MIO3_PG_curve_edge_loop(PropertyGroup):
     control_num: IntProperty(name="Control Points", default=3, min=2, max=30)
+    control_mode: EnumProperty(
+        name="Control Point Placement",
+        items=[
+            ("EVEN", "Even", "Place control points at equal intervals along the edge loop"),
+            ("FIT", "Fit", "Place control points so that the curve follows the original shape"),
+        ],
+        default="EVEN",
+    )
+    placement: EnumProperty(
+        name="Vertex Placement",
+        items=[
+            ("LENGTH", "Slide", "Keep the spacing of vertices along the curve"),
+            ("PROJECT", "Project", "Move vertices to the nearest point on the curve"),
+        ],
+        default="LENGTH",
+    )
+    falloff_radius: FloatProperty(
+        name="Falloff Radius",
+        description="Move nearby vertices within this distance along the edges",
+        default=0.0,
+        min=0.0,
+        soft_max=1.0,
+        subtype="DISTANCE",
+    )
+    snap_target: PointerProperty(
+        name="Snap Target",
+        description="Snap control points and the curve onto the surface of this mesh",
+        type=bpy.types.Object,
+        poll=poll_snap_target,
+    )
+    restore_spline: BoolProperty(
+        name="Restore Last Curve",
+        description="Restore the confirmed curve when the same edge loop is edited again",
+        default=True,
+    )
     hide_spline: BoolProperty(name="Hide Cueve", default=False)
 
 
@@ -102,6 +180,7 @@ classes = [
     MIO3_PT_mesh_tools,
     MIO3_PT_mesh_select,
     MIO3_PT_curve_edge_loop,
+    MIO3_PT_performance,
 ]
 
 
@@ -0,0 +1,219 @@
+import hashlib
+from .utils import MeshTopology, get_vert_co_array, get_x_mirror_vert_map
+from .globals import lazy_import
+
+np = lazy_import("numpy")
+
+# {mesh session_uid: (topology fingerprint, TopologyMirror)}
+_topology_mirror_cache = {}
+
+
+class TopologyMirror:
+    """トポロジーから求めたX軸ミラーの対応表 (対応が無ければ -1)"""
+
+    def __init__(self, num_verts, num_edges, num_faces, num_loops):
+        self.verts = np.full(num_verts, -1, dtype=np.int64)
+        self.edges = np.full(num_edges, -1, dtype=np.int64)
+        self.faces = np.full(num_faces, -1, dtype=np.int64)
+        self.loops = np.full(num_loops, -1, dtype=np.int64)
+
+
+def get_topology_fingerprint(topo):
+    digest = hashlib.blake2b(digest_size=16)
+    for array in (topo.edge_verts, topo.loop_verts, topo.face_total):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return topo.num_verts, topo.num_edges, topo.num_faces, digest.digest()
+
+
+def get_loop_twins(topo):
+    """多様体の辺で隣り合う面の反対向きのループ"""
+    start, loops = topo.edge_loops
+    manifold = np.flatnonzero(topo.edge_face_count == 2)
+    l0 = loops[start[manifold]]
+    l1 = loops[start[manifold] + 1]
+    twins = np.full(len(topo.loop_verts), -1, dtype=np.int64)
+    twins[l0] = l1
+    twins[l1] = l0
+    return twins
+
+
+def find_center_seeds(topo, co, threshold):
+    """中心線上の辺の両側の面を起点にする"""
+    start, loops = topo.edge_loops
+    on_center = np.abs(co[:, 0]) <= threshold
+    edges = np.flatnonzero((topo.edge_face_count == 2) & on_center[topo.edge_verts].all(axis=1))
+    l0 = loops[start[edges]]
+    l1 = topo.loop_next[loops[start[edges] + 1]]
+    valid = topo.loop_verts[l0] == topo.loop_verts[l1]
+    return l0[valid], l1[valid]
+
+
+def find_position_seeds(topo, co, threshold, face_done):
+    """未対応の面から位置が対称な面のペアを起点にする"""
+    face_centers = np.zeros((topo.num_faces, 3))
+    np.add.at(face_centers, topo.loop_faces, co[topo.loop_verts])
+    face_centers /= topo.face_total[:, None]
+
+    face_mirror = get_x_mirror_vert_map(face_centers, threshold)
+    faces = np.flatnonzero(~face_done & (face_mirror >= 0))
+    faces = faces[~face_done[face_mirror[faces]]]
+    faces = faces[topo.face_total[faces] == topo.face_total[face_mirror[faces]]]
+    if not len(faces):
+        return faces, faces
+
+    # 最初の頂点に対応する頂点を相手の面から探し、全頂点が逆順に対応するか確かめる
+    vert_mirror = get_x_mirror_vert_map(co, threshold)
+    mirror_faces = face_mirror[faces]
+    lf = topo.face_start[faces]
+    target = vert_mirror[topo.loop_verts[lf]]
+    lg = np.full(len(faces), -1, dtype=np.int64)
+    for k in range(int(topo.face_total[faces].max())):
+        has = np.flatnonzero((k < topo.face_total[mirror_faces]) & (lg < 0))
+        loops = topo.face_start[mirror_faces[has]] + k
+        hit = topo.loop_verts[loops] == target[has]
+        lg[has[hit]] = loops[hit]
+
+    valid = lg >= 0
+    lf, lg = lf[valid], lg[valid]
+    la, lb = expand_face_pairs(topo, lf, lg)
+    pair_ids = np.repeat(np.arange(len(lf)), topo.face_total[topo.loop_faces[lf]])
+    matched = np.ones(len(lf), dtype=bool)
+    np.logical_and.at(matched, pair_ids, vert_mirror[topo.loop_verts[la]] == topo.loop_verts[lb])
+    return lf[matched], lg[matched]
+
+
+def expand_face_pairs(topo, lf, lg):
+    """対応する面の全ループを、片方は順方向、もう片方は逆方向にたどって並べる"""
+    faces_f = topo.loop_faces[lf]
+    faces_g = topo.loop_faces[lg]
+    counts = topo.face_total[faces_f]
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    start_f = np.repeat(topo.face_start[faces_f], counts)
+    start_g = np.repeat(topo.face_start[faces_g], counts)
+    la = start_f + (np.repeat(lf, counts) - start_f + k) % np.repeat(counts, counts)
+    lb = start_g + (np.repeat(lg, counts) - start_g - k) % np.repeat(counts, counts)
+    return la, lb
+
+
+def propagate_mirror(topo, mirror, twins, lf, lg):
+    """対応する面のペアから隣接する面へ幅優先で対応を広げる"""
+    faces = mirror.faces
+    while len(lf):
+        f = topo.loop_faces[lf]
+        g = topo.loop_faces[lg]
+        valid = (faces[f] < 0) & (faces[g] < 0) & (topo.face_total[f] == topo.face_total[g])
+        lf, lg, f, g = lf[valid], lg[valid], f[valid], g[valid]
+
+        # 同じ面を取り合うペアは番号の小さいものを残す
+        pair_ids = np.arange(len(lf))
+        owner = np.full(topo.num_faces, len(lf))
+        np.minimum.at(owner, f, pair_ids)
+        np.minimum.at(owner, g, pair_ids)
+        valid = (owner[f] == pair_ids) & (owner[g] == pair_ids)
+        lf, lg, f, g = lf[valid], lg[valid], f[valid], g[valid]
+        if not len(lf):
+            break
+        faces[f] = g
+        faces[g] = f
+
+        la, lb = expand_face_pairs(topo, lf, lg)
+        mirror.loops[la] = lb
+        mirror.loops[lb] = la
+        va, vb = topo.loop_verts[la], topo.loop_verts[lb]
+        new = mirror.verts[va] < 0
+        mirror.verts[va[new]] = vb[new]
+        mirror.verts[vb[new]] = va[new]
+        lb_prev = topo.loop_prev[lb]
+        ea, eb = topo.loop_edges[la], topo.loop_edges[lb_prev]
+        new = mirror.edges[ea] < 0
+        mirror.edges[ea[new]] = eb[new]
+        mirror.edges[eb[new]] = ea[new]
+
+        ta, tb = twins[la], twins[lb_prev]
+        valid = (ta >= 0) & (tb >= 0)
+        ta, tb = ta[valid], topo.loop_next[tb[valid]]
+        la, lb_prev = la[valid], lb_prev[valid]
+        # 面の向きが揃っていない箇所は広げない
+        valid = (topo.loop_verts[ta] == topo.loop_verts[topo.loop_next[la]]) & (
+            topo.loop_verts[tb] == topo.loop_verts[lb_prev]
+        )
+        lf, lg = ta[valid], tb[valid]
+        valid = (faces[topo.loop_faces[lf]] < 0) & (faces[topo.loop_faces[lg]] < 0)
+        lf, lg = lf[valid], lg[valid]
+
+
+def keep_mutual_pairs(table):
+    """互いに対応していない番号を -1 にする"""
+    matched = np.flatnonzero(table >= 0)
+    table[matched[table[table[matched]] != matched]] = -1
+    return table
+
+
+def build_topology_mirror(topo, co, threshold):
+    """中心線の辺から外側へ面をたどり、頂点・辺・面の対応表を作る"""
+    mirror = TopologyMirror(topo.num_verts, topo.num_edges, topo.num_faces, len(topo.loop_verts))
+    if not topo.num_faces:
+        return mirror
+
+    twins = get_loop_twins(topo)
+    propagate_mirror(topo, mirror, twins, *find_center_seeds(topo, co, threshold))
+    # 中心線につながらない部分は位置が対称な面から始める
+    while True:
+        lf, lg = find_position_seeds(topo, co, threshold, mirror.faces >= 0)
+        if not len(lf):
+            break
+        before = np.count_nonzero(mirror.faces >= 0)
+        propagate_mirror(topo, mirror, twins, lf, lg)
+        if np.count_nonzero(mirror.faces >= 0) == before:
+            break
+
+    # 互いに対応しない頂点・辺は外す
+    for table in (mirror.verts, mirror.edges):
+        keep_mutual_pairs(table)
+    return mirror
+
+
+def get_topology_mirror(mesh, threshold=0.001):
+    """トポロジーミラーの対応表を取得する（トポロジーが変わるまでキャッシュ）"""
+    topo = MeshTopology(mesh)
+    fingerprint = get_topology_fingerprint(topo)
+    cached = _topology_mirror_cache.get(mesh.session_uid)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    co = get_vert_co_array(mesh).astype(np.float64)
+    extent = np.ptp(co, axis=0).max() if len(co) else 0.0
+    mirror = build_topology_mirror(topo, co, max(threshold * extent, 0.0001))
+    _topology_mirror_cache[mesh.session_uid] = (fingerprint, mirror)
+    return mirror
+
+
+def get_mirror_vert_map(mesh, co=None, threshold=0.0001):
+    """X軸ミラーの頂点番号を取得する (トポロジーミラーが有効なら優先し、無ければ位置で探す)"""
+    if co is None:
+        co = get_vert_co_array(mesh)
+    if not mesh.use_mirror_topology:
+        return get_x_mirror_vert_map(co, threshold)
+
+    mirror = get_topology_mirror(mesh).verts.copy()
+    if (unmatched := mirror < 0).any():
+        mirror[unmatched] = get_x_mirror_vert_map(co, threshold)[unmatched]
+        # 位置で補った頂点がトポロジーで対応済みの頂点を指すことがあるので、互いに対応する組だけ残す
+        keep_mutual_pairs(mirror)
+    return mirror
+
+
+def find_x_mirror_vert_pairs(mesh, bm, selected_verts):
+    """選択頂点とミラー側の頂点の組を取得する（メッシュはエディットモードの内容と同期しておく）"""
+    bm.verts.ensure_lookup_table()
+    mirror = get_mirror_vert_map(mesh)
+    selected = set(selected_verts)
+    mirror_verts = {}
+    for v in selected_verts:
+        if (i := mirror[v.index]) >= 0 and (mirror_vert := bm.verts[i]) not in selected:
+            mirror_verts[v] = mirror_vert
+    return mirror_verts
+
+
+def clear_mirror_cache():
+    _topology_mirror_cache.clear()
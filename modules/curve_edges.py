@@ -1,11 +1,9 @@
 import bpy
-import gpu
-import blf
 import bmesh
-from mathutils import Vector, kdtree
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
 from bpy.types import Operator, SpaceView3D
 from bpy.props import IntProperty
-from gpu_extras.batch import batch_for_shader
 from bpy_extras import view3d_utils
 from bpy.app.translations import pgettext_iface as tt_iface
 from .curve_edges_utils import (
@@ -14,11 +12,26 @@ from .curve_edges_utils import (
     calc_spline_points,
     calc_vertex_params,
     calc_control_points,
+    fit_control_points,
+    get_points_at_lengths,
+    project_to_polyline,
     is_closed_loop,
     redraw_3d_views,
     PASS_THROUGH_KEY,
 )
-from ..globals import get_preferences
+from ..globals import get_preferences, lazy_import
+from ..mirror import get_mirror_vert_map, get_topology_fingerprint
+from ..utils import (
+    Mio3MTDebug,
+    MeshTopology,
+    get_edge_vert_array,
+    get_geodesic_distances,
+    get_vert_co_array,
+    transform_points,
+    update_edit_mesh,
+)
+
+np = lazy_import("numpy")
 
 ver4_5 = bpy.app.version >= (4, 5, 0)
 
@@ -30,11 +43,19 @@ text_lines = [
 ]
 
 
+STATE_KEY = "mio3_curve_edges"
+
+
+def get_mesh_fingerprint(mesh):
+    num_verts, num_edges, num_faces, digest = get_topology_fingerprint(MeshTopology(mesh))
+    return "{}:{}:{}:{}".format(num_verts, num_edges, num_faces, digest.hex())
+
+
 def get_guide_lines(base_x=50, base_y=50, line_height=26):
     return [(base_x, base_y + i * line_height, tt_iface(text)) for i, text in enumerate(reversed(text_lines))]
 
 
-class MESH_OT_mio3_curve_edges_base(Operator):
+class MESH_OT_mio3_curve_edges_base(Mio3MTDebug, Operator):
     bl_label = "Curve Edges"
     bl_options = {"REGISTER", "UNDO"}
 
@@ -51,6 +72,8 @@ class MESH_OT_mio3_curve_edges_base(Operator):
     _x_mirror = False
     _verts_mirror_map = {}  # ミラー頂点マッピング
     _point_mirror_map = {}  # ミラー制御点マッピング
+    _falloff = None  # (頂点, 起点の位置, 重み, 元の位置, 起点, 起点の元の位置)
+    _snap_tree = None  # (BVHTree, ターゲットのワールド行列, その逆行列)
 
     _active_spline_index = -1
     _active_point_index = -1
@@ -111,9 +134,78 @@ class MESH_OT_mio3_curve_edges_base(Operator):
                         point_map[i] = j
                         break
             self._point_mirror_map[spline_idx] = point_map
+            spline["half_positions"], spline["mirror_positions"] = self.get_half_positions(spline, point_map)
+            spline["is_symmetric"] = None
+
+    def get_half_positions(self, spline, point_map):
+        """中心をまたぐ左右対称な閉じたスプラインなら、計算する半分と中心の頂点の位置、各頂点の相手の位置を取得する"""
+        mirror_map = self._verts_mirror_map
+        vert_indices = spline["vert_indices"]
+        if not spline["is_closed"] or not mirror_map:
+            return None, None
+
+        # 制御点が左右対称でなければカーブも対称にならない
+        control_points = transform_points(self._matrix_world.inverted(), np.array(spline["control_points"]))
+        on_center = np.abs(control_points[:, 0]) < 1e-4
+        if not all(i in point_map or on_center[i] for i in range(len(control_points))):
+            return None, None
+
+        index_of = {v: k for k, v in enumerate(vert_indices)}
+        partners = [mirror_map.get(i, -1) for i in vert_indices]
+        if not all(p in index_of for p in partners):
+            return None, None
+        mirror_positions = np.array([index_of[p] for p in partners], dtype=np.int64)
+
+        # 元の位置が左右対称でなければ投影した結果も対称にならない
+        local_co = np.array(spline["local_co"], dtype=np.float64)
+        if not np.allclose(local_co[mirror_positions] * (-1.0, 1.0, 1.0), local_co, atol=1e-4):
+            return None, None
+
+        positions = [k for k, (i, p) in enumerate(zip(vert_indices, partners)) if p == i or local_co[k, 0] > 0]
+        num_center = sum(1 for i, p in zip(vert_indices, partners) if p == i)
+        if len(positions) * 2 - num_center != len(vert_indices):
+            return None, None
+        return np.array(positions, dtype=np.int64), mirror_positions
+
+    def is_symmetric_spline(self, spline_idx, spline, use_project):
+        """現在の制御点と頂点のパラメータで、半分の計算を反転して残りに使えるか確かめる"""
+        # スナップ先の形状によってはカーブが対称にならない
+        if self._snap_tree:
+            return False
+
+        # 移動やミラーの切り替えで制御点の対称性が崩れていないか
+        point_map = self._point_mirror_map.get(spline_idx, {})
+        control_points = transform_points(
+            self._matrix_world.inverted(), np.array(spline["control_points"], dtype=np.float64)
+        )
+        mirror_points = np.array([point_map.get(i, i) for i in range(len(control_points))], dtype=np.int64)
+        if not np.allclose(control_points[mirror_points] * (-1.0, 1.0, 1.0), control_points, atol=1e-4):
+            return False
+        if use_project:
+            return True
+
+        # 反転したカーブ上の長さの割合が、相手の頂点の割合に移るか
+        mirror_positions = spline["mirror_positions"]
+        t = np.array([param["t"] for param in spline["vertex_params"]])
+        if len(t) != len(mirror_positions):
+            return False
+        spline_points = np.asarray(spline["spline_points"], dtype=np.float64)
+        lengths = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(spline_points, axis=0), axis=1))])
+        if lengths[-1] <= 0:
+            return False
+        offset = lengths[mirror_points[0] * self._segments] / lengths[-1]
+        error = (t + t[mirror_positions] - offset) % 1.0
+        return bool(np.all(np.minimum(error, 1.0 - error) < 1e-4))
 
-    def create_spline_loops(self, context):
-        """頂点からスプライン情報を作成する"""
+    @staticmethod
+    def get_control_points(context, world_co, control_num, is_closed):
+        """設定に応じて制御点を均等に配置するか、元の形状にフィットさせる"""
+        if context.window_manager.mio3ce.control_mode == "FIT":
+            return fit_control_points(world_co, control_num, is_closed)
+        return calc_control_points(world_co, control_num, is_closed)
+
+    def create_spline_loops(self, context, restore=False):
+        """頂点からスプライン情報を作成する (restore なら保存されたスプラインを復元する)"""
         spline_datas = []
         obj = context.active_object
         bm = bmesh.from_edit_mesh(obj.data)
@@ -125,15 +217,25 @@ class MESH_OT_mio3_curve_edges_base(Operator):
         if not (edge_loops := find_edge_loops(selected_verts)):
             return None
 
+        stored_splines = self.load_spline_state(obj) if restore and STATE_KEY in obj.data else {}
+        stored_loops = [stored_splines.get(frozenset(v.index for v in loop)) for loop in edge_loops]
+        # 制御点の数は復元したスプラインに合わせる (数が異なる場合は最初のスプラインに合わせる)
+        if stored_counts := [len(stored["control_points"]) // 3 for stored in stored_loops if stored]:
+            self.points = stored_counts[0]
+
         world_matrix = self._matrix_world
-        for loop in edge_loops:
+        for loop, stored in zip(edge_loops, stored_loops):
+            if stored:
+                spline_datas.append(self.restore_spline(stored))
+                continue
+
             ordered_verts = order_vertices(loop)
             if not ordered_verts or len(ordered_verts) < 3:
                 continue
 
             is_closed = is_closed_loop(ordered_verts)
             world_co = [world_matrix @ v.co for v in ordered_verts]
-            control_points = calc_control_points(world_co, self.points, is_closed)
+            control_points = self.get_control_points(context, world_co, self.points, is_closed)
             spline_points = calc_spline_points(control_points, self._segments, is_closed)
             vertex_params = calc_vertex_params(world_co, spline_points, is_closed)
             spline_datas.append(
@@ -147,76 +249,189 @@ class MESH_OT_mio3_curve_edges_base(Operator):
                 }
             )
 
+        falloff_radius = context.window_manager.mio3ce.falloff_radius
+        if self._x_mirror or falloff_radius > 0:
+            obj.update_from_editmode()
+
         # Xミラー用マッピング
         if self._x_mirror:
+            mirror_verts = get_mirror_vert_map(obj.data)
+            self._verts_mirror_map = {
+                v.index: mirror_index for v in selected_verts if (mirror_index := int(mirror_verts[v.index])) >= 0
+            }
             self.create_spline_mirror_map(spline_datas)
-            self._verts_mirror_map = {}
-            kd = kdtree.KDTree(len(bm.verts))
-            for i, v in enumerate(bm.verts):
-                kd.insert(v.co, i)
-            kd.balance()
-            for v in selected_verts:
-                mirror_co = Vector((-v.co.x, v.co.y, v.co.z))
-                co_find = kd.find(mirror_co)
-                if co_find[2] < 1e-4:
-                    self._verts_mirror_map[v.index] = bm.verts[co_find[1]].index
 
         self._spline_datas = spline_datas
+        self.create_falloff(obj.data, falloff_radius)
         return len(spline_datas)
 
-    def update_vertices(self, context):
-        """スプラインに沿って頂点位置を更新する"""
-        obj = context.active_object
-        bm = bmesh.from_edit_mesh(obj.data)
+    def save_spline_state(self, obj):
+        """確定したスプラインをローカル座標でメッシュに保存する"""
+        obj.update_from_editmode()
+        mesh = obj.data
+        co = get_vert_co_array(mesh)
         matrix_world_inv = self._matrix_world.inverted()
 
-        processed = set()
-        for spline in self._spline_datas:
-            spline_points = spline["spline_points"]
-            vertex_params = spline["vertex_params"]
-            vertex_indices = spline["vert_indices"]
-
-            cumulative_lengths = [0.0]
-            for p_prev, p_next in zip(spline_points[:-1], spline_points[1:]):
-                seg_len = (Vector(p_next) - Vector(p_prev)).length
-                cumulative_lengths.append(cumulative_lengths[-1] + seg_len)
-            total_length = cumulative_lengths[-1] or 1e-9
-
-            for param, vert_idx in zip(vertex_params, vertex_indices):
-                if vert_idx in processed:
-                    continue
-
-                target_len = total_length * param["t"]
-
-                segment_idx = 0
-                for i in range(1, len(cumulative_lengths)):
-                    if target_len <= cumulative_lengths[i]:
-                        segment_idx = i - 1
-                        break
+        splines = {}
+        for i, spline in enumerate(self._spline_datas):
+            vert_indices = spline["vert_indices"]
+            control_points = transform_points(matrix_world_inv, np.array(spline["control_points"], dtype=np.float64))
+            splines[str(i)] = {
+                "vert_indices": vert_indices,
+                "is_closed": spline["is_closed"],
+                "control_points": control_points.ravel().tolist(),
+                "t": [param["t"] for param in spline["vertex_params"]],
+                "result_co": co[vert_indices].ravel().tolist(),
+            }
+        mesh[STATE_KEY] = {"fingerprint": get_mesh_fingerprint(mesh), "splines": splines}
 
-                p1_len = cumulative_lengths[segment_idx]
-                p2_len = cumulative_lengths[segment_idx + 1]
-                segment_len = p2_len - p1_len or 1e-9
-                local_t = (target_len - p1_len) / segment_len
+    @staticmethod
+    def load_spline_state(obj):
+        """保存されたスプラインのうち、確定したときの形状のままのものを取得する"""
+        obj.update_from_editmode()
+        mesh = obj.data
+        state = mesh[STATE_KEY]
+        # トポロジーが変わっていたら破棄する
+        if state.get("fingerprint") != get_mesh_fingerprint(mesh):
+            del mesh[STATE_KEY]
+            return {}
+
+        co = get_vert_co_array(mesh)
+        stored_splines = {}
+        for spline in state["splines"].values():
+            vert_indices = list(spline["vert_indices"])
+            result_co = np.reshape(spline["result_co"], (-1, 3))
+            if np.allclose(co[vert_indices], result_co, atol=1e-5):
+                stored_splines[frozenset(vert_indices)] = spline
+        return stored_splines
+
+    def restore_spline(self, stored):
+        """保存されたスプラインを、確定した形状を元の位置として復元する"""
+        matrix_world = self._matrix_world
+        is_closed = bool(stored["is_closed"])
+        control_points = transform_points(matrix_world, np.reshape(stored["control_points"], (-1, 3)))
+        control_points = [tuple(p) for p in control_points.tolist()]
+        return {
+            "vertex_params": [{"t": t, "distance": 0} for t in stored["t"]],
+            "local_co": [Vector(co) for co in np.reshape(stored["result_co"], (-1, 3)).tolist()],
+            "vert_indices": list(stored["vert_indices"]),
+            "control_points": control_points,
+            "spline_points": calc_spline_points(control_points, self._segments, is_closed),
+            "is_closed": is_closed,
+        }
+
+    def create_snap_tree(self, context):
+        """スナップ先のメッシュのBVHTreeを作成する"""
+        self._snap_tree = None
+        target = context.window_manager.mio3ce.snap_target
+        if target is None or target.type != "MESH" or target == context.active_object:
+            return
+        tree = BVHTree.FromObject(target, context.evaluated_depsgraph_get())
+        self._snap_tree = (tree, target.matrix_world.copy(), target.matrix_world.inverted())
+
+    def snap_to_surface(self, points):
+        """ワールド座標の点をスナップ先のメッシュの最も近い位置に移動する"""
+        tree, matrix, matrix_inv = self._snap_tree
+        local_points = transform_points(matrix_inv, np.array(points, dtype=np.float64)).tolist()
+        find_nearest = tree.find_nearest
+        snapped = []
+        for point, local_point in zip(points, local_points):
+            location = find_nearest(local_point)[0]
+            snapped.append((matrix @ location).to_tuple() if location is not None else tuple(point))
+        return snapped
+
+    def create_falloff(self, mesh, radius):
+        """ループ周辺の頂点に移動量を伝える重みを、辺に沿った距離から計算する"""
+        self._falloff = None
+        if radius <= 0:
+            return
 
-                p1 = Vector(spline_points[segment_idx])
-                p2 = Vector(spline_points[segment_idx + 1])
-                new_world_pos = p1.lerp(p2, local_t)
+        sources = {i for spline in self._spline_datas for i in spline["vert_indices"]}
+        if self._x_mirror:
+            sources.update([self._verts_mirror_map[i] for i in sources if i in self._verts_mirror_map])
+        sources = np.array(sorted(sources), dtype=np.int64)
+
+        local_co = get_vert_co_array(mesh).astype(np.float64)
+        co = transform_points(self._matrix_world, local_co)
+        indices, distances, owners = get_geodesic_distances(co, get_edge_vert_array(mesh), sources.tolist(), radius)
+        hidden = np.empty(len(mesh.vertices), dtype=bool)
+        mesh.vertices.foreach_get("hide", hidden)
+        affected = (distances > 0) & ~hidden[indices]
+        indices, distances, owners = indices[affected], distances[affected], owners[affected]
+        if not len(indices):
+            return
 
-                bm.verts[vert_idx].co = matrix_world_inv @ new_world_pos
-                processed.add(vert_idx)
+        # 起点から離れるほど滑らかに弱くする
+        x = distances / radius
+        weights = 1.0 - x * x * (3.0 - 2.0 * x)
+        owner_pos = np.searchsorted(sources, owners)
+        self._falloff = (indices, owner_pos, weights[:, None], local_co[indices], sources, local_co[sources])
+
+    def apply_falloff(self, bm):
+        """ループの頂点の移動量を重み付きで周辺の頂点に加える"""
+        indices, owner_pos, weights, origin_co, sources, source_origin_co = self._falloff
+        verts = bm.verts
+        source_co = np.array([verts[i].co for i in sources.tolist()], dtype=np.float64)
+        new_co = origin_co + weights * (source_co - source_origin_co)[owner_pos]
+        for i, co in zip(indices.tolist(), new_co.tolist()):
+            verts[i].co = co
 
-            if self._x_mirror:
-                for vi, vert_index in enumerate(spline["vert_indices"]):
-                    if vert_index in self._verts_mirror_map:
-                        mirror_idx = self._verts_mirror_map[vert_index]
-                        if mirror_idx not in processed:
-                            mirror_vert = bm.verts[mirror_idx]
-                            real_vert = bm.verts[vert_index]
-                            mirror_vert.co = Vector((-real_vert.co.x, real_vert.co.y, real_vert.co.z))
-                            processed.add(mirror_idx)
+    def update_vertices(self, context):
+        """スプラインに沿って頂点位置を更新する"""
+        obj = context.active_object
+        bm = bmesh.from_edit_mesh(obj.data)
+        verts = bm.verts
+        matrix_world = self._matrix_world
+        matrix_world_inv = matrix_world.inverted()
+        use_project = context.window_manager.mio3ce.placement == "PROJECT"
+        use_mirror = self._x_mirror
+        mirror_map = self._verts_mirror_map
 
-        bmesh.update_edit_mesh(obj.data)
+        processed = set()
+        for spline_idx, spline in enumerate(self._spline_datas):
+            vert_indices = np.array(spline["vert_indices"], dtype=np.int64)
+            # 左右対称なスプラインは半分だけ計算して、残りは反転してコピーする
+            half_positions = spline.get("half_positions") if use_mirror else None
+            if half_positions is not None:
+                # 対称かどうかは制御点かミラーの設定が変わったときだけ確かめ直す
+                if spline.get("is_symmetric") is None:
+                    spline["is_symmetric"] = self.is_symmetric_spline(spline_idx, spline, use_project)
+                if not spline["is_symmetric"]:
+                    half_positions = None
+            positions = np.arange(len(vert_indices)) if half_positions is None else half_positions
+
+            if use_project:
+                # 元の位置から変形後のスプラインへ最短距離で投影する
+                origin_co = np.array(spline["local_co"], dtype=np.float64)[positions]
+                new_co = project_to_polyline(transform_points(matrix_world, origin_co), spline["spline_points"])
+            else:
+                if len(spline["vertex_params"]) != len(vert_indices):
+                    continue
+                t = np.array([param["t"] for param in spline["vertex_params"]])[positions]
+                new_co = get_points_at_lengths(spline["spline_points"], t)
+            new_co = transform_points(matrix_world_inv, new_co)
+
+            indices = vert_indices[positions]
+            if use_mirror:
+                partners = np.array([mirror_map.get(i, -1) for i in indices.tolist()], dtype=np.int64)
+                if half_positions is not None:
+                    new_co[partners == indices, 0] = 0.0
+
+            for i, co in zip(indices.tolist(), new_co.tolist()):
+                if i not in processed:
+                    verts[i].co = co
+                    processed.add(i)
+
+            if use_mirror:
+                mirror_co = new_co * (-1.0, 1.0, 1.0)
+                for i, co in zip(partners.tolist(), mirror_co.tolist()):
+                    if i >= 0 and i not in processed:
+                        verts[i].co = co
+                        processed.add(i)
+
+        if self._falloff:
+            self.apply_falloff(bm)
+        update_edit_mesh(obj.data)
 
     def move_control_point(self, context, mouse_pos, axis=None):
         """制御点を移動する"""
@@ -245,24 +460,35 @@ class MESH_OT_mio3_curve_edges_base(Operator):
         elif axis == "Z":
             offset_l.x = offset_l.y = 0
 
-        updated_splines = set()
+        updated_splines = {}
         for s_idx, p_idx in self._selected_points:
             orig_w = Vector(self._store_points[s_idx][p_idx])
             orig_l = matrix_world_inv @ orig_w
             new_l = orig_l + offset_l
             new_w = matrix_world @ new_l
             self._spline_datas[s_idx]["control_points"][p_idx] = new_w.to_tuple()
-            updated_splines.add(s_idx)
+            updated_splines.setdefault(s_idx, set()).add(p_idx)
 
             if self._x_mirror:
                 mirror_idx = self._point_mirror_map.get(s_idx, {}).get(p_idx)
                 if mirror_idx is not None:
                     mirror_l = Vector((-new_l.x, new_l.y, new_l.z))
                     self._spline_datas[s_idx]["control_points"][mirror_idx] = (matrix_world @ mirror_l).to_tuple()
+                    updated_splines[s_idx].add(mirror_idx)
 
-        for s_idx in updated_splines:
+        for s_idx, p_indices in updated_splines.items():
             sd = self._spline_datas[s_idx]
-            sd["spline_points"] = calc_spline_points(sd["control_points"], self._segments, sd["is_closed"])
+            sd["is_symmetric"] = None
+            if self._snap_tree:
+                control_points = sd["control_points"]
+                p_indices = sorted(p_indices)
+                snapped = self.snap_to_surface([control_points[i] for i in p_indices])
+                for p_idx, point in zip(p_indices, snapped):
+                    control_points[p_idx] = point
+                spline_points = calc_spline_points(control_points, self._segments, sd["is_closed"])
+                sd["spline_points"] = self.snap_to_surface(spline_points)
+            else:
+                sd["spline_points"] = calc_spline_points(sd["control_points"], self._segments, sd["is_closed"])
 
         self.update_vertices(context)
 
@@ -281,7 +507,7 @@ class MESH_OT_mio3_curve_edges_base(Operator):
         for spline_idx, spline in enumerate(self._spline_datas):
             is_closed = spline["is_closed"]
             world_co = [world_matrix @ bm.verts[i].co for i in spline["vert_indices"]]
-            spline["control_points"] = calc_control_points(world_co, new_num, is_closed)
+            spline["control_points"] = self.get_control_points(context, world_co, new_num, is_closed)
             spline["spline_points"] = calc_spline_points(spline["control_points"], self._segments, is_closed)
             spline["vertex_params"] = calc_vertex_params(world_co, spline["spline_points"], is_closed)
 
@@ -405,9 +631,10 @@ class MESH_OT_mio3_curve_edges_base(Operator):
             world_co = [world_matrix @ co for co in local_co]
             vert_indices = spline["vert_indices"]
             is_closed = spline["is_closed"]
-            spline["control_points"] = calc_control_points(world_co, control_num, is_closed)
+            spline["control_points"] = self.get_control_points(context, world_co, control_num, is_closed)
             spline["spline_points"] = calc_spline_points(spline["control_points"], self._segments, is_closed)
             spline["vertex_params"] = calc_vertex_params(world_co, spline["spline_points"], is_closed)
+            spline["is_symmetric"] = None
 
             for i, vert_index in enumerate(vert_indices):
                 if i >= len(local_co) or vert_index >= len(bm.verts):
@@ -420,7 +647,9 @@ class MESH_OT_mio3_curve_edges_base(Operator):
                     if mirror_idx < len(bm.verts):
                         bm.verts[mirror_idx].co = Vector((-original.x, original.y, original.z))
 
-        bmesh.update_edit_mesh(obj.data)
+        if self._falloff:
+            self.apply_falloff(bm)
+        update_edit_mesh(obj.data)
         redraw_3d_views(context)
 
     def select_points_rect(self, context, shift=False):
@@ -522,14 +751,17 @@ class MESH_OT_mio3_curve_edges_base(Operator):
 
     def finish_deform(self, context):
         self.__class__.remove_handler()
+        self.save_spline_state(context.active_object)
         self.end_move_mode("finish_deform")
         redraw_3d_views(context)
+        self.print_time()
         self.report({"INFO"}, "Confirmed")
         return {"FINISHED"}
 
     def cancel_deform(self, context):
         self.__class__.remove_handler()
         redraw_3d_views(context)
+        self.print_time()
         return {"CANCELLED"}
 
     @staticmethod
@@ -537,6 +769,9 @@ class MESH_OT_mio3_curve_edges_base(Operator):
         if props.hide_spline:
             return
 
+        import gpu
+        from gpu_extras.batch import batch_for_shader
+
         p_default = self._point_size_default
         p_selected = self._point_size_selected
         p_active = self._point_size_active
@@ -583,6 +818,10 @@ class MESH_OT_mio3_curve_edges_base(Operator):
 
     @staticmethod
     def draw_2d(self, context, props):
+        import blf
+        import gpu
+        from gpu_extras.batch import batch_for_shader
+
         font_id = 0
         blf.size(font_id, 16)
         blf.color(font_id, 1.0, 1.0, 1.0, 1.0)
@@ -606,6 +845,7 @@ class MESH_OT_mio3_curve_edges_base(Operator):
         batch.draw(shader)
 
     def invoke(self, context, event):
+        self.start_time()
         cls = self.__class__
         pref = get_preferences()
         cls.remove_handler()
@@ -627,8 +867,9 @@ class MESH_OT_mio3_curve_edges_base(Operator):
         context.window_manager.mio3ce.hide_spline = False
         self._text_lines = get_guide_lines()
 
-        if not self.create_spline_loops(context):
+        if not self.create_spline_loops(context, restore=context.window_manager.mio3ce.restore_spline):
             return self.cancel_deform(context)
+        self.create_snap_tree(context)
 
         self.update_vertices(context)
 
@@ -637,9 +878,18 @@ class MESH_OT_mio3_curve_edges_base(Operator):
         cls._handle_2d = SpaceView3D.draw_handler_add(self.draw_2d, (self, context, props), "WINDOW", "POST_PIXEL")
 
         context.window_manager.modal_handler_add(self)
+        self.pause_time()
         return {"RUNNING_MODAL"}
 
     def modal(self, context, event):
+        # 入力を待つ時間は含めず、イベントの処理にかかった時間だけを計測する
+        self.resume_time()
+        try:
+            return self.modal_event(context, event)
+        finally:
+            self.pause_time()
+
+    def modal_event(self, context, event):
         mouse_x = event.mouse_region_x
         mouse_y = event.mouse_region_y
 
@@ -786,6 +1036,8 @@ class MESH_OT_mio3_curve_edges_base(Operator):
 
         elif event.type == "M" and event.value == "PRESS":
             self._x_mirror = not self._x_mirror
+            for spline in self._spline_datas:
+                spline["is_symmetric"] = None
 
         elif event.type == "H" and event.value == "PRESS":
             self.toggle_display_spline(context)
@@ -817,6 +1069,7 @@ class MESH_OT_mio3_curve_edges_base(Operator):
                 self._spline_datas[i]["spline_points"] = calc_spline_points(
                     control_points, self._segments, self._spline_datas[i]["is_closed"]
                 ).copy()
+                self._spline_datas[i]["is_symmetric"] = None
         self.update_vertices(context)
 
 
@@ -837,12 +1090,14 @@ class MESH_OT_mio3_curve_edges_quick(MESH_OT_mio3_curve_edges_base):
         return self.execute(context)
 
     def execute(self, context):
+        self.start_time()
         self._x_mirror = context.active_object.data.use_mirror_x
         self._matrix_world = context.active_object.matrix_world
         self.points = context.window_manager.mio3ce.control_num
         for i in range(self.iterations):
             if self.create_spline_loops(context):
                 self.update_vertices(context)
+        self.print_time()
         return {"FINISHED"}
 
 
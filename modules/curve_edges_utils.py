@@ -1,5 +1,9 @@
-import numpy as np
 from mathutils import Vector
+from ..globals import lazy_import
+
+np = lazy_import("numpy")
+
+FIT_TANGENT_SCALE = 0.5
 
 # 押したときにデフォの処理をするキー "WHEELINMOUSE", "WHEELOUTMOUSE",
 PASS_THROUGH_KEY = {
@@ -179,6 +183,146 @@ def calc_control_points(vertices, control_num, is_closed=False):
     return control_points
 
 
+def get_spline_basis(u, num_points, is_closed=False):
+    """スプラインのパラメータ u (区間番号 + 区間内の位置) に対する各制御点の重み"""
+    num_segments = num_points if is_closed else num_points - 1
+    u = np.clip(u, 0.0, num_segments)
+    seg = np.minimum(u.astype(np.int64), num_segments - 1)
+    t = u - seg
+    t2, t3 = t * t, t * t * t
+    h00 = 2 * t3 - 3 * t2 + 1
+    h10 = t3 - 2 * t2 + t
+    h01 = -2 * t3 + 3 * t2
+    h11 = t3 - t2
+
+    # 接線は calc_spline_points で隣の制御点との距離に制限されるので、均等な間隔のときの値で近似する
+    c = FIT_TANGENT_SCALE
+    weights = np.stack([-c * h10, h00 - c * h11, h01 + c * h10, c * h11], axis=1)
+    indices = seg[:, None] + np.arange(-1, 3)
+    indices = indices % num_points if is_closed else np.clip(indices, 0, num_points - 1)
+
+    basis = np.zeros((len(u), num_points))
+    np.add.at(basis, (np.repeat(np.arange(len(u)), 4), indices.ravel()), weights.ravel())
+    return basis
+
+
+def fit_control_points(vertices, control_num, is_closed=False, iterations=3):
+    """頂点とのずれが最小になる制御点の位置を最小二乗法で求める"""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    num_points = max(3, control_num) if is_closed else max(2, control_num)
+    if len(vertices) <= num_points:
+        return calc_control_points(vertices, control_num, is_closed)
+
+    points = np.vstack([vertices, vertices[:1]]) if is_closed else vertices
+    lengths = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+    if lengths[-1] <= 0:
+        return []
+    t = lengths[: len(vertices)] / lengths[-1]
+
+    num_segments = num_points if is_closed else num_points - 1
+    u = t * num_segments
+    samples = np.linspace(0.0, num_segments, num_segments * 16 + 1)
+    sample_basis = get_spline_basis(samples, num_points, is_closed)
+    for _ in range(iterations):
+        basis = get_spline_basis(u, num_points, is_closed)
+        if is_closed:
+            control_points = np.linalg.lstsq(basis, vertices, rcond=None)[0]
+        else:
+            # 端点は頂点に固定する
+            control_points = np.empty((num_points, 3))
+            control_points[0], control_points[-1] = vertices[0], vertices[-1]
+            if num_points > 2:
+                rhs = vertices - np.outer(basis[:, 0], vertices[0]) - np.outer(basis[:, -1], vertices[-1])
+                control_points[1:-1] = np.linalg.lstsq(basis[:, 1:-1], rhs, rcond=None)[0]
+
+        # 頂点は弧長の割合で配置されるので、同じ割合になるパラメータを求め直す
+        sample_points = sample_basis @ control_points
+        sample_lengths = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(sample_points, axis=0), axis=1))])
+        if sample_lengths[-1] <= 0:
+            break
+        u = np.interp(t * sample_lengths[-1], sample_lengths, samples)
+
+    return [tuple(p) for p in control_points]
+
+
+def get_points_at_lengths(polyline, t):
+    """ポリラインの全長に対する割合 t の位置をまとめて取得する"""
+    polyline = np.asarray(polyline, dtype=np.float64)
+    lengths = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(polyline, axis=0), axis=1))])
+    target = np.asarray(t, dtype=np.float64) * lengths[-1]
+    seg = np.clip(np.searchsorted(lengths, target) - 1, 0, len(polyline) - 2)
+    seg_lengths = lengths[seg + 1] - lengths[seg]
+    local_t = np.divide(target - lengths[seg], seg_lengths, out=np.zeros_like(target), where=seg_lengths > 0)
+    return polyline[seg] + local_t[:, None] * (polyline[seg + 1] - polyline[seg])
+
+
+def expand_ranges(owners, starts, counts):
+    """owners[i] と範囲 starts[i]:starts[i]+counts[i] の各番号の組に展開する"""
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(owners, counts), np.repeat(starts, counts) + offsets
+
+
+def get_box_distance_sq(points, box_min, box_max):
+    near = np.maximum(box_min - points, 0.0) + np.maximum(points - box_max, 0.0)
+    return np.einsum("ij,ij->i", near, near)
+
+
+def project_to_polyline(points, polyline, leaf_size=8):
+    """各点をポリライン上の最も近い点に投影する (連続する線分をまとめた2段の箱で候補を絞り込む)"""
+    points = np.asarray(points, dtype=np.float64)
+    polyline = np.asarray(polyline, dtype=np.float64)
+    if len(polyline) < 2 or not len(points):
+        return np.repeat(polyline[:1], len(points), axis=0) if len(polyline) else points.copy()
+
+    heads, tails = polyline[:-1], polyline[1:]
+    leaf_starts = np.arange(0, len(heads), leaf_size)
+    leaf_counts = np.diff(np.append(leaf_starts, len(heads)))
+    leaf_min = np.minimum.reduceat(np.minimum(heads, tails), leaf_starts, axis=0)
+    leaf_max = np.maximum.reduceat(np.maximum(heads, tails), leaf_starts, axis=0)
+    # 箱の中央付近の頂点はポリライン上の点なので、そこまでの距離が最短距離の上限になる
+    leaf_mid = heads[leaf_starts + leaf_counts // 2]
+
+    node_starts = np.arange(0, len(leaf_starts), leaf_size)
+    node_counts = np.diff(np.append(node_starts, len(leaf_starts)))
+    node_min = np.minimum.reduceat(leaf_min, node_starts, axis=0)
+    node_max = np.maximum.reduceat(leaf_max, node_starts, axis=0)
+    node_mid = leaf_mid[node_starts + node_counts // 2]
+
+    # 上の段: すべての点とすべての箱
+    point_idx = np.repeat(np.arange(len(points)), len(node_starts))
+    node_idx = np.tile(np.arange(len(node_starts)), len(points))
+    mid = points[point_idx] - node_mid[node_idx]
+    bound_sq = np.full(len(points), np.inf)
+    np.minimum.at(bound_sq, point_idx, np.einsum("ij,ij->i", mid, mid))
+    near_sq = get_box_distance_sq(points[point_idx], node_min[node_idx], node_max[node_idx])
+    valid = near_sq <= bound_sq[point_idx]
+    point_idx, node_idx = point_idx[valid], node_idx[valid]
+
+    # 下の段: 候補の箱に含まれる小さい箱
+    point_idx, leaf_idx = expand_ranges(point_idx, node_starts[node_idx], node_counts[node_idx])
+    mid = points[point_idx] - leaf_mid[leaf_idx]
+    np.minimum.at(bound_sq, point_idx, np.einsum("ij,ij->i", mid, mid))
+    near_sq = get_box_distance_sq(points[point_idx], leaf_min[leaf_idx], leaf_max[leaf_idx])
+    valid = near_sq <= bound_sq[point_idx]
+    point_idx, seg_idx = expand_ranges(point_idx[valid], leaf_starts[leaf_idx[valid]], leaf_counts[leaf_idx[valid]])
+
+    # 候補の線分への投影
+    seg_heads = heads[seg_idx]
+    seg_vecs = tails[seg_idx] - seg_heads
+    length_sq = np.einsum("ij,ij->i", seg_vecs, seg_vecs)
+    along = np.einsum("ij,ij->i", points[point_idx] - seg_heads, seg_vecs)
+    t = np.clip(np.divide(along, length_sq, out=np.zeros_like(along), where=length_sq > 0), 0.0, 1.0)
+    projected = seg_heads + t[:, None] * seg_vecs
+    diff = points[point_idx] - projected
+    dist_sq = np.einsum("ij,ij->i", diff, diff)
+
+    order = np.lexsort((dist_sq, point_idx))
+    first = order[np.r_[True, point_idx[order[1:]] != point_idx[order[:-1]]]]
+    result = np.empty_like(points)
+    result[point_idx[first]] = projected[first]
+    return result
+
+
 def calc_spline_points(control_points, segments=10, is_closed=False):
     """スプラインポイントを計算する"""
     if len(control_points) < 2:
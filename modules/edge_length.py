@@ -1,8 +1,117 @@
 import bpy
 import bmesh
-from mathutils import Vector
-from bpy.props import EnumProperty, FloatProperty
-from ..utils import Mio3MTOperator, find_x_mirror_vert_pairs
+from bpy.props import EnumProperty, FloatProperty, IntProperty
+from ..utils import (
+    EdgeGraph,
+    Mio3MTOperator,
+    get_edge_vert_array,
+    get_select_array,
+    get_vert_co_array,
+    label_connected_components,
+    normalize_rows,
+    update_edit_mesh,
+)
+from ..mirror import get_mirror_vert_map
+from ..globals import lazy_import
+
+np = lazy_import("numpy")
+
+
+def get_edge_matchings(num_verts, edge_verts):
+    """頂点を共有しない辺のグループに分ける"""
+    priority = np.random.default_rng(0).permutation(len(edge_verts))
+    remaining = np.arange(len(edge_verts))
+    matchings = []
+    while len(remaining):
+        p = priority[remaining]
+        v1, v2 = edge_verts[remaining, 0], edge_verts[remaining, 1]
+        best = np.full(num_verts, len(edge_verts))
+        np.minimum.at(best, v1, p)
+        np.minimum.at(best, v2, p)
+        picked = (best[v1] == p) & (best[v2] == p)
+        matchings.append(remaining[picked])
+        remaining = remaining[~picked]
+    return matchings
+
+
+def get_simple_chains(num_verts, edge_verts):
+    """分岐のない3頂点以上のつながりを順序付けて取得する"""
+    graph = EdgeGraph(num_verts, edge_verts)
+    labels = label_connected_components(num_verts, edge_verts)
+    max_degree = np.zeros(labels.max() + 1, dtype=np.int64)
+    np.maximum.at(max_degree, labels, graph.degree)
+    simple = max_degree[labels] <= 2
+
+    chains = []
+    for degree in (1, 2):
+        for v in np.flatnonzero(simple & (graph.degree == degree)).tolist():
+            if graph.is_visited(v):
+                continue
+            path = graph.walk(v)
+            if len(path) > 2:
+                chains.append((path, degree == 2))
+    return chains
+
+
+def layout_chains(co, chains, target_length):
+    """開いたつながりを辺の向きを保ったまま目標の長さで並べ直し、重心を元の位置に合わせる"""
+    lengths = np.array([len(path) for path in chains])
+    verts = np.concatenate(chains)
+    chain = np.repeat(np.arange(len(chains)), lengths)
+    first = np.cumsum(lengths) - lengths
+
+    is_last = np.arange(len(verts)) == (first + lengths - 1)[chain]
+    step = normalize_rows(co[verts[np.minimum(np.arange(len(verts)) + 1, len(verts) - 1)]] - co[verts])
+    step *= target_length
+    step[is_last] = 0
+
+    exclusive = np.cumsum(step, axis=0) - step
+    new_co = exclusive - exclusive[first][chain]
+    new_co += (np.add.reduceat(co[verts] - new_co, first) / lengths[:, None])[chain]
+    co[verts] = new_co
+
+
+def layout_loop(co, path, target_length, iterations=20):
+    """閉じたループを元の形に沿って等間隔に並べ直し、辺が目標の長さになるよう重心を中心に拡大縮小する"""
+    points = co[path]
+    closed_points = np.vstack([points, points[:1]])
+    lengths = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(closed_points, axis=0), axis=1))])
+    if lengths[-1] <= 0:
+        return
+
+    # 元の線上の位置を、弦の長さがそろうように調整する
+    spacing = np.full(len(path), lengths[-1] / len(path))
+    for _ in range(iterations):
+        along = np.concatenate([[0.0], np.cumsum(spacing[:-1])])
+        new_co = np.stack([np.interp(along, lengths, closed_points[:, k]) for k in range(3)], axis=1)
+        chords = np.linalg.norm(np.roll(new_co, -1, axis=0) - new_co, axis=1)
+        if chords.min() <= 0:
+            break
+        spacing *= chords.mean() / chords
+        spacing *= lengths[-1] / spacing.sum()
+
+    mean_length = chords.mean()
+    if mean_length <= 0:
+        return
+    co[path] = points.mean(axis=0) + (new_co - new_co.mean(axis=0)) * (target_length / mean_length)
+
+
+def relax_edge_lengths(co, edge_verts, target_length, iterations, tolerance=1e-6):
+    """頂点を共有しない辺ごとにまとめて長さを合わせる (誤差が許容値以下になれば終える)"""
+    matchings = get_edge_matchings(len(co), edge_verts)
+    for _ in range(iterations):
+        for matching in matchings:
+            v1, v2 = edge_verts[matching, 0], edge_verts[matching, 1]
+            vectors = co[v2] - co[v1]
+            lengths = np.linalg.norm(vectors, axis=1)
+            scale = np.divide(lengths - target_length, lengths * 2, out=np.zeros_like(lengths), where=lengths > 0)
+            offsets = vectors * scale[:, None]
+            co[v1] += offsets
+            co[v2] -= offsets
+
+        lengths = np.linalg.norm(co[edge_verts[:, 1]] - co[edge_verts[:, 0]], axis=1)
+        if np.abs(lengths - target_length).max() <= target_length * tolerance:
+            break
 
 
 class MIO3AS_OT_edge_length(Mio3MTOperator):
@@ -40,49 +149,56 @@ class MIO3AS_OT_edge_length(Mio3MTOperator):
         max=1.0,
     )
 
+    iterations: IntProperty(name="Iterations", default=10, min=1, max=100)
+
     def execute(self, context):
         self.start_time()
         obj = context.active_object
 
         bm = bmesh.from_edit_mesh(obj.data)
-        bm.edges.ensure_lookup_table()
         bm.verts.ensure_lookup_table()
 
-        selected_edges = {e for e in bm.edges if e.select}
-        if obj.data.use_mirror_x:
-            selected_verts = {v for e in selected_edges for v in e.verts}
-            mirror_vert_pairs = find_x_mirror_vert_pairs(bm, selected_verts)
-
-        if not selected_edges:
+        obj.update_from_editmode()
+        mesh = obj.data
+        edge_verts = get_edge_vert_array(mesh)[get_select_array(mesh.edges)]
+        if not len(edge_verts):
             self.report({"WARNING"}, "No edges selected")
             return {"CANCELLED"}
 
+        co = get_vert_co_array(mesh).astype(np.float64)
+        edge_lengths = np.linalg.norm(co[edge_verts[:, 1]] - co[edge_verts[:, 0]], axis=1)
+
         if self.mode == "LONGEST":
-            target_length = max(e.calc_length() for e in selected_edges)
+            target_length = edge_lengths.max()
         elif self.mode == "SHORTEST":
-            target_length = min(e.calc_length() for e in selected_edges)
+            target_length = edge_lengths.min()
         elif self.mode == "CUSTOM":
             target_length = self.custom_length
         else:
-            target_length = sum(e.calc_length() for e in selected_edges) / len(selected_edges)
-
-        for edge in selected_edges:
-            v1, v2 = edge.verts
-            mid_point = (v1.co + v2.co) / 2
-            direction = (v2.co - v1.co).normalized()
-            v1.co = mid_point - direction * (target_length / 2)
-            v2.co = mid_point + direction * (target_length / 2)
-
-            if obj.data.use_mirror_x:
-                mirror_v1 = mirror_vert_pairs.get(v1)
-                mirror_v2 = mirror_vert_pairs.get(v2)
-                if mirror_v1 and mirror_v2:
-                    mirror_mid_point = (mirror_v1.co + mirror_v2.co) / 2
-                    mirror_direction = (mirror_v2.co - mirror_v1.co).normalized()
-                    mirror_v1.co = mirror_mid_point - mirror_direction * (target_length / 2)
-                    mirror_v2.co = mirror_mid_point + mirror_direction * (target_length / 2)
-
-        bmesh.update_edit_mesh(obj.data)
+            target_length = edge_lengths.mean()
+
+        chains = get_simple_chains(len(co), edge_verts)
+        if open_chains := [path for path, is_closed in chains if not is_closed]:
+            layout_chains(co, open_chains, target_length)
+        for path in [path for path, is_closed in chains if is_closed]:
+            layout_loop(co, path, target_length)
+        relax_edge_lengths(co, edge_verts, target_length, self.iterations)
+
+        moved_verts = np.unique(edge_verts)
+        if mesh.use_mirror_x:
+            mirror_verts = get_mirror_vert_map(mesh)
+            src = moved_verts[mirror_verts[moved_verts] >= 0]
+            dst = mirror_verts[src]
+            outside = ~np.isin(dst, moved_verts)
+            src, dst = src[outside], dst[outside]
+            co[dst] = co[src] * (-1.0, 1.0, 1.0)
+            moved_verts = np.concatenate([moved_verts, dst])
+
+        verts = bm.verts
+        for i, new_co in zip(moved_verts.tolist(), co[moved_verts].tolist()):
+            verts[i].co = new_co
+
+        update_edit_mesh(obj.data)
         self.print_time()
         return {"FINISHED"}
 
@@ -94,6 +210,7 @@ class MIO3AS_OT_edge_length(Mio3MTOperator):
         row = layout.row()
         row.prop(self, "custom_length")
         row.enabled = self.mode == "CUSTOM"
+        layout.prop(self, "iterations")
         if self.mode == "SMOOTH":
             layout.prop(self, "smooth_factor")
 
@@ -1,8 +1,21 @@
 import bpy
 import bmesh
-from mathutils import Vector, kdtree
+from mathutils import Vector
 from bpy.props import IntProperty, BoolProperty
-from ..utils import Mio3MTOperator, find_x_mirror_vert_pairs, get_connected_vert_groups
+from ..utils import (
+    EdgeGraph,
+    Mio3MTOperator,
+    get_connected_vert_labels,
+    get_edge_vert_array,
+    get_select_array,
+    get_vert_co_array,
+    split_by_labels,
+    update_edit_mesh,
+)
+from ..mirror import find_x_mirror_vert_pairs
+from ..globals import lazy_import
+
+np = lazy_import("numpy")
 
 
 class OBJECT_OT_mio3_group_merge(Mio3MTOperator):
@@ -16,27 +29,35 @@ class OBJECT_OT_mio3_group_merge(Mio3MTOperator):
     limit: BoolProperty(name="Limit Size", default=True)
 
     def execute(self, context):
+        self.start_time()
         obj = context.active_object
         if obj is None or obj.type != "MESH":
             return {"CANCELLED"}
 
         bm = bmesh.from_edit_mesh(obj.data)
         bm.verts.ensure_lookup_table()
-        selected_verts = [v for v in bm.verts if v.select]
+        verts = bm.verts
 
-        use_mirror_x = obj.data.use_mirror_x
+        obj.update_from_editmode()
+        mesh = obj.data
+        vert_indices, labels = get_connected_vert_labels(mesh)
+        selected_verts = [verts[i] for i in vert_indices.tolist()]
+        co = get_vert_co_array(mesh)
+        graph = EdgeGraph(len(co), get_edge_vert_array(mesh)[get_select_array(mesh.edges)])
+
+        use_mirror_x = mesh.use_mirror_x
         marge_size = min(self.marge_size, len(selected_verts))
         offset = self.offset
 
-        target_vert_groups = get_connected_vert_groups(selected_verts)
+        target_vert_groups = split_by_labels(vert_indices, labels)
         if use_mirror_x:
-            mirror_vert_pairs = find_x_mirror_vert_pairs(bm, selected_verts)
+            mirror_vert_pairs = find_x_mirror_vert_pairs(mesh, bm, selected_verts)
         else:
             mirror_vert_pairs = {}
 
         units = []
         for unit_verts in target_vert_groups:
-            ordered_verts, is_closed = self.get_ordered_verts(unit_verts, marge_size)
+            ordered_verts, is_closed = self.get_ordered_verts(graph, co, unit_verts, marge_size)
             if not ordered_verts:
                 continue
 
@@ -48,42 +69,53 @@ class OBJECT_OT_mio3_group_merge(Mio3MTOperator):
                 limit = True
 
             groups = self.split_groups(ordered_verts, marge_size, limit)
-            merge_cos = [self.get_merge_cos(group) for group in groups]
+            merge_cos = [self.get_merge_cos(co, group) for group in groups]
+            groups = [[verts[i] for i in group] for group in groups]
 
             units.append((groups, merge_cos))
 
+        targetmap = {}
         for groups, merge_cos in units:
             for group, merge_co in zip(groups, merge_cos):
-                valid_group = [v for v in group if v.is_valid]
-                if len(valid_group) < 2:
-                    continue
-
+                self.add_weld_group(targetmap, group, merge_co)
                 if use_mirror_x:
-                    mirror_group = [mirror_vert_pairs.get(v) for v in valid_group if v in mirror_vert_pairs]
-                    bmesh.ops.pointmerge(bm, verts=valid_group, merge_co=merge_co)
+                    mirror_group = [mirror_vert_pairs[v] for v in group if v in mirror_vert_pairs]
                     mirror_merge_co = Vector((-merge_co.x, merge_co.y, merge_co.z))
-                    if mirror_group:
-                        bmesh.ops.pointmerge(bm, verts=mirror_group, merge_co=mirror_merge_co)
-                else:
-                    bmesh.ops.pointmerge(bm, verts=valid_group, merge_co=merge_co)
+                    self.add_weld_group(targetmap, mirror_group, mirror_merge_co)
 
-        bmesh.update_edit_mesh(obj.data)
+        for v, target in targetmap.items():
+            while target in targetmap:
+                target = targetmap[target]
+            targetmap[v] = target
+        if targetmap:
+            bmesh.ops.weld_verts(bm, targetmap=targetmap)
+
+        update_edit_mesh(obj.data)
+        self.print_time()
         return {"FINISHED"}
 
     @staticmethod
-    def get_merge_cos(verts):
-        count = len(verts)
+    def add_weld_group(targetmap, group, merge_co):
+        """グループの先頭の頂点に残りを結合するように登録する"""
+        valid_group = [v for v in group if v not in targetmap]
+        if len(valid_group) < 2:
+            return
+        target = valid_group[0]
+        target.co = merge_co
+        for v in valid_group[1:]:
+            targetmap[v] = target
+
+    @staticmethod
+    def get_merge_cos(co, indices):
+        count = len(indices)
         if count == 0:
             return None
         if count % 2 == 1:
-            center_index = count // 2
-            return verts[center_index].co.copy()
+            return Vector(co[indices[count // 2]])
         else:
-            idx1 = count // 2 - 1
-            idx2 = count // 2
-            co1 = verts[idx1].co
-            co2 = verts[idx2].co
-            return (co1 + co2) / 2
+            idx1 = indices[count // 2 - 1]
+            idx2 = indices[count // 2]
+            return Vector((co[idx1] + co[idx2]) / 2)
 
     @staticmethod
     def split_groups(target_verts, marge_size, limit):
@@ -114,36 +146,18 @@ class OBJECT_OT_mio3_group_merge(Mio3MTOperator):
         return groups
 
     @staticmethod
-    def get_ordered_verts(target_verts, size):
+    def get_ordered_verts(graph, co, target_verts, size):
         if len(target_verts) < 2 or len(target_verts) < size:
             return None, None
 
-        end_points = [
-            v for v in target_verts if sum(ov in target_verts for e in v.link_edges for ov in [e.other_vert(v)]) == 1
-        ]
-
-        if end_points:
+        end_points = target_verts[graph.degree[target_verts] == 1]
+        if len(end_points):
             start_v = end_points[0]
         else:
-            start_v = min(target_verts, key=lambda v: (-v.co.x, v.co.z, v.co.y))
-
-        ordered_verts = [start_v]
-        visited = {start_v}
-        cur_v = start_v
-        while len(ordered_verts) < len(target_verts):
-            next_v = None
-            for e in cur_v.link_edges:
-                ov = e.other_vert(cur_v)
-                if ov in target_verts and ov not in visited:
-                    next_v = ov
-                    break
-            if next_v is None:
-                break
-            ordered_verts.append(next_v)
-            visited.add(next_v)
-            cur_v = next_v
-
-        return ordered_verts, not bool(end_points)
+            target_co = co[target_verts]
+            start_v = target_verts[np.lexsort((target_co[:, 1], target_co[:, 2], -target_co[:, 0]))[0]]
+
+        return graph.walk(int(start_v)), not len(end_points)
 
 
 def register():
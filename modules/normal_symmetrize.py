@@ -1,8 +1,10 @@
 import bpy
-import bmesh
-from mathutils import Vector, kdtree
 from bpy.props import EnumProperty
-from ..utils import Mio3MTOperator, find_x_mirror_verts
+from ..mirror import get_mirror_vert_map, get_topology_mirror
+from ..utils import MeshTopology, Mio3MTOperator, get_select_array, get_vert_co_array
+from ..globals import lazy_import
+
+np = lazy_import("numpy")
 
 
 class MESH_OT_mio3_normal_symmetrize(Mio3MTOperator):
@@ -32,58 +34,61 @@ class MESH_OT_mio3_normal_symmetrize(Mio3MTOperator):
             return {"CANCELLED"}
 
         bpy.ops.object.mode_set(mode="OBJECT")
+        mesh = obj.data
 
-        bm = bmesh.new()
-        bm.from_mesh(obj.data)
-        bm.verts.ensure_lookup_table()
+        topo = MeshTopology(mesh)
+        co = get_vert_co_array(mesh)
+        normals = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+        mesh.corner_normals.foreach_get("vector", normals)
+        normals = normals.reshape((-1, 3))
+        face_centers = np.empty(topo.num_faces * 3, dtype=np.float32)
+        mesh.polygons.foreach_get("center", face_centers)
+        face_centers = face_centers.reshape((-1, 3))
 
-        kd = kdtree.KDTree(len(bm.verts))
-        for i, v in enumerate(bm.verts):
-            kd.insert(v.co, i)
-        kd.balance()
+        mirror_verts = get_mirror_vert_map(mesh, co, self._threshold)
+        selected = get_select_array(mesh.vertices)
+        selected[mirror_verts[selected & (mirror_verts >= 0)]] = True
 
-        normals = [list(l.normal) for l in obj.data.loops]
+        if self.axis == "POSITIVE_X":
+            is_source = co[:, 0] > self._center_threshold
+        else:
+            is_source = co[:, 0] < -self._center_threshold
 
-        get_mirror_point = lambda co: Vector((-co.x, co.y, co.z))
-        get_mirror_normal = lambda n: [-n[0], n[1], n[2]]
+        source_verts = selected & is_source & (mirror_verts >= 0)
+        source_loops = np.flatnonzero(source_verts[topo.loop_verts])
+        target_loops = self.find_mirror_loops(topo, face_centers, mirror_verts, source_loops)
+        if mesh.use_mirror_topology:
+            mirror_loops = get_topology_mirror(mesh).loops[source_loops]
+            target_loops = np.where(mirror_loops >= 0, mirror_loops, target_loops)
 
-        selected_verts = {v for v in bm.verts if v.select}
-        selected_verts.update(find_x_mirror_verts(bm, selected_verts))
+        valid = target_loops >= 0
+        normals[target_loops[valid]] = normals[source_loops[valid]] * (-1.0, 1.0, 1.0)
 
-        if self.axis == "POSITIVE_X":
-            is_source = lambda x: x > self._center_threshold
-        else:
-            is_source = lambda x: x < -self._center_threshold
-
-        for v in selected_verts:
-            if not is_source(v.co.x):
-                continue
-
-            mirror_co = get_mirror_point(v.co)
-            _, idx, dist = kd.find(mirror_co)
-            if dist > self._threshold:
-                continue
-            mirror_v = bm.verts[idx]
-
-            for face in v.link_faces:
-                mirror_center = get_mirror_point(face.calc_center_median())
-                if not (target_face := self.find_mirror_face(mirror_v.link_faces, mirror_center)):
-                    continue
-
-                target_loops = {l.vert: l for l in target_face.loops}
-                for loop in face.loops:
-                    if loop.vert == v and mirror_v in target_loops:
-                        sym_loop = target_loops[mirror_v]
-                        normals[sym_loop.index] = get_mirror_normal(normals[loop.index])
-
-        bm.free()
-        obj.data.normals_split_custom_set([tuple(n) for n in normals])
+        mesh.normals_split_custom_set(normals)
         bpy.ops.object.mode_set(mode="EDIT")
         self.print_time()
         return {"FINISHED"}
 
-    def find_mirror_face(self, mirror_faces, mirror_center):
-        return min(mirror_faces, key=lambda f: (mirror_center - f.calc_center_median()).length_squared)
+    @staticmethod
+    def find_mirror_loops(topo, face_centers, mirror_verts, source_loops):
+        """ミラー頂点のループのうち、面の中心が反転した位置に最も近いものを取得する"""
+        target_loops = np.full(len(source_loops), -1, dtype=np.int64)
+        mirror_v = mirror_verts[topo.loop_verts[source_loops]]
+        start, vert_loops = topo.vert_loops
+        counts = start[mirror_v + 1] - start[mirror_v]
+        if not counts.sum():
+            return target_loops
+
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        candidates = vert_loops[np.repeat(start[mirror_v], counts) + offsets]
+        mirror_centers = face_centers[topo.loop_faces[source_loops]] * (-1.0, 1.0, 1.0)
+        dist = ((face_centers[topo.loop_faces[candidates]] - np.repeat(mirror_centers, counts, axis=0)) ** 2).sum(axis=1)
+
+        segments = np.repeat(np.arange(len(source_loops)), counts)
+        order = np.lexsort((dist, segments))
+        has = counts > 0
+        target_loops[has] = candidates[order[(np.cumsum(counts) - counts)[has]]]
+        return target_loops
 
 
 def menu(self, context):
@@ -1,8 +1,32 @@
 import bpy
-import numpy as np
+import bmesh
 from bpy.types import Operator
 from mathutils import Vector
-from ..utils import Mio3MTOperator
+from ..utils import Mio3MTOperator, get_select_array, get_vert_co_array, update_edit_mesh
+from ..globals import lazy_import
+
+np = lazy_import("numpy")
+
+
+def get_selected_center(mesh):
+    selected = get_select_array(mesh.vertices)
+    if not np.any(selected):
+        return None
+    return get_vert_co_array(mesh)[selected].mean(axis=0, dtype=np.float64)
+
+
+def shift_mesh_data(mesh, offset, buffer):
+    """頂点とすべてのシェイプキーの座標をまとめてずらす"""
+    flat = buffer[: len(mesh.vertices) * 3]
+    co = flat.reshape((-1, 3))
+    collections = [mesh.vertices]
+    if mesh.shape_keys:
+        collections.extend(key_block.data for key_block in mesh.shape_keys.key_blocks)
+    for collection in collections:
+        collection.foreach_get("co", flat)
+        co += offset
+        collection.foreach_set("co", flat)
+    mesh.update()
 
 
 class OBJECT_OT_mio3_origin_to_active(Mio3MTOperator, Operator):
@@ -22,29 +46,47 @@ class OBJECT_OT_mio3_origin_to_active(Mio3MTOperator, Operator):
         return self.execute(context)
 
     def execute(self, context):
-        obj = context.active_object
-
-        bpy.ops.object.mode_set(mode="OBJECT")
-
-        v_len = len(obj.data.vertices)
-        co = np.empty(v_len * 3, dtype=np.float32)
-        obj.data.vertices.foreach_get("co", co)
-        co = co.reshape((v_len, 3))
-
-        selected = np.array([v.select for v in obj.data.vertices])
-        if not np.any(selected):
+        self.start_time()
+        if context.mode == "EDIT_MESH":
+            objects = [obj for obj in context.objects_in_mode_unique_data if obj.type == "MESH" and self.is_local(obj)]
+        else:
+            objects = [context.active_object]
+
+        # シェイプキーはエディットモードで一括に動かせないので、まとめて一度だけモードを切り替える
+        edit_objects = [obj for obj in objects if obj.mode == "EDIT" and not obj.data.shape_keys]
+        key_objects = [obj for obj in objects if obj.mode == "EDIT" and obj.data.shape_keys]
+        data_objects = [obj for obj in objects if obj.mode != "EDIT"]
+
+        moved = False
+        for obj in edit_objects:
+            obj.update_from_editmode()
+            if (center := get_selected_center(obj.data)) is None:
+                continue
+            bm = bmesh.from_edit_mesh(obj.data)
+            bmesh.ops.translate(bm, vec=-Vector(center), verts=bm.verts[:])
+            update_edit_mesh(obj.data)
+            obj.location += obj.matrix_world.to_3x3() @ Vector(center)
+            moved = True
+
+        if key_objects:
+            bpy.ops.object.mode_set(mode="OBJECT")
+            data_objects.extend(key_objects)
+
+        if data_objects:
+            buffer = np.empty(max(len(obj.data.vertices) for obj in data_objects) * 3, dtype=np.float32)
+            for obj in data_objects:
+                if (center := get_selected_center(obj.data)) is None:
+                    continue
+                shift_mesh_data(obj.data, -center, buffer)
+                obj.location += obj.matrix_world.to_3x3() @ Vector(center)
+                moved = True
+
+        if key_objects:
+            bpy.ops.object.mode_set(mode="EDIT")
+
+        if not moved:
             return {"CANCELLED"}
-
-        center = co[selected].mean(axis=0)
-
-        delta_world = obj.matrix_world.to_3x3() @ Vector(center)
-        obj.location += delta_world
-
-        co -= center
-        obj.data.vertices.foreach_set("co", co.ravel())
-        obj.data.update()
-
-        bpy.ops.object.mode_set(mode="EDIT")
+        self.print_time()
         return {"FINISHED"}
 
 
@@ -1,112 +1,158 @@
 import bpy
 import bmesh
 import math
-from collections import deque
-from bpy.props import BoolProperty, FloatProperty, EnumProperty
-from ..utils import Mio3MTOperator, deselect_all, get_bone_by_weight, get_bone_by_closest
-from mathutils import kdtree, Vector
-from bpy_extras import view3d_utils
+from bpy.props import BoolProperty, FloatProperty, EnumProperty, IntProperty
+from ..cache import get_mesh_topology, get_world_co
+from ..utils import (
+    Mio3MTOperator,
+    get_bone_directions,
+    get_closest_segments,
+    get_deform_bones,
+    get_edge_vert_array,
+    get_select_array,
+    get_vert_co_array,
+    get_vert_weight_bones,
+    label_connected_components,
+    normalize_rows,
+    set_edges_select,
+    transform_points,
+    update_edit_mesh,
+)
+from mathutils import Vector
+from ..globals import lazy_import
+
+np = lazy_import("numpy")
 
 
 # select_more_op = bpy.ops.mesh.select_more.get_rna_type()
 # select_less_op = bpy.ops.mesh.select_less.get_rna_type()
 
 
-def mio3_select_edge_loop_more(obj):
+def get_edge_selection(obj):
+    obj.update_from_editmode()
+    mesh = obj.data
+    return get_mesh_topology(mesh), get_select_array(mesh.edges)
+
+
+def clear_inactive_history(bm):
+    active_element = bm.select_history.active
+    if not (isinstance(active_element, bmesh.types.BMEdge) and active_element.select):
+        bm.select_history.clear()
+
+
+def edge_loop_more_step(topo, selected, frontier):
+    """ループ方向に1つ先の辺を取得する"""
+    frontier = frontier[topo.edge_face_count[frontier] == 2]
+    edges = np.repeat(frontier, 2)
+    verts = topo.edge_verts[frontier].ravel()
+    # 4辺が接続する頂点のみ
+    mask = topo.vert_valence[verts] == 4
+    edges, verts = edges[mask], verts[mask]
+
+    start, vert_edge_list = topo.vert_edges
+    candidates = vert_edge_list[start[verts][:, None] + np.arange(4)]
+    edge_faces = topo.edge_faces[edges][:, None, None, :]
+    candidate_faces = topo.edge_faces[candidates][:, :, :, None]
+    shared = ((candidate_faces == edge_faces) & (candidate_faces >= 0)).any(axis=(2, 3))
+
+    valid = (candidates != edges[:, None]) & (topo.edge_face_count[candidates] == 2) & ~shared
+    valid &= ~selected[candidates]
+    has = valid.any(axis=1)
+    first = np.argmax(valid, axis=1)
+    return np.unique(candidates[has, first[has]])
+
+
+def edge_ring_more_step(topo, selected, frontier):
+    """リング方向に1つ先の辺を取得する"""
+    loops = topo.get_edge_loops(frontier)
+    faces = topo.loop_faces[loops]
+    total = topo.face_total[faces]
+    loops = loops[total >= 4]
+    faces = faces[total >= 4]
+    total = total[total >= 4]
+    face_start = topo.face_start[faces]
+
+    # 辺と頂点を共有しない最初の辺
+    k = loops - face_start
+    target = np.where(k == 0, 2, np.where(k == 1, 3, np.where(k == total - 1, 1, 0)))
+    ring_edges = np.unique(topo.loop_edges[face_start + target])
+    return ring_edges[~selected[ring_edges]]
+
+
+def edge_loop_less_step(topo, selected):
+    """ループの端の辺を取得する"""
+    edge_indices = np.flatnonzero(selected)
+    edge_verts = topo.edge_verts[edge_indices]
+    degree = np.bincount(edge_verts.ravel(), minlength=topo.num_verts)
+    count_selected = degree[edge_verts[:, 0]] + degree[edge_verts[:, 1]]
+    return edge_indices[count_selected <= 3]
+
+
+def edge_ring_less_step(topo, selected):
+    """リングの端の辺を取得する"""
+    face_selected = np.bincount(topo.loop_faces[selected[topo.loop_edges]], minlength=topo.num_faces)
+    loop_edges = topo.loop_edges
+    has_other = selected[loop_edges] & (face_selected[topo.loop_faces] > 1)
+    count_selected_ring = np.bincount(loop_edges[has_other], minlength=topo.num_edges)
+    return np.flatnonzero(selected & (count_selected_ring <= 1))
+
+
+def mio3_select_edges_more(obj, step_func, steps=1):
     bm = bmesh.from_edit_mesh(obj.data)
-    selected_edges = {e for e in bm.edges if e.select}
+    bm.edges.ensure_lookup_table()
+    topo, selected = get_edge_selection(obj)
+    selected = selected.copy()
 
-    new_selecte_dges = set()
-    for edge in selected_edges:
-        for vert in edge.verts:
-            connected_edges = [e for e in vert.link_edges if e != edge]
-            if len(connected_edges) != 3:
-                continue
-            for e in connected_edges:
-                if len(e.link_faces) == 2 and len(edge.link_faces) == 2:
-                    shared_faces = set(e.link_faces) & set(edge.link_faces)
-                    if not shared_faces and not e.select:
-                        new_selecte_dges.add(e)
-                        break
+    new_edges = []
+    frontier = np.flatnonzero(selected)
+    for _ in range(steps):
+        frontier = step_func(topo, selected, frontier)
+        if not len(frontier):
+            break
+        selected[frontier] = True
+        new_edges.append(frontier)
 
-    for new_edge in new_selecte_dges:
-        new_edge.select = True
+    if new_edges:
+        set_edges_select(bm, np.concatenate(new_edges), True)
 
-    bmesh.update_edit_mesh(obj.data)
+    update_edit_mesh(obj.data)
 
 
-def mio3_select_edge_ring_more(obj):
+def mio3_select_edges_less(obj, step_func, steps=1):
     bm = bmesh.from_edit_mesh(obj.data)
-    selected_edges = {e for e in bm.edges if e.select}
-
-    new_selecte_dges = set()
-    for edge in selected_edges:
-        ring_edges = set()
-        for vert in edge.verts:
-            for face in vert.link_faces:
-                if edge not in face.edges:
-                    continue
-                opposite_edge = []
-                for e in face.edges:
-                    if e == edge:
-                        continue
-                    verts_not_in_edge = e.verts[0] not in edge.verts and e.verts[1] not in edge.verts
-                    if verts_not_in_edge:
-                        opposite_edge.append(e)
-                if opposite_edge:
-                    ring_edges.add(opposite_edge[0])
-
-        new_selecte_dges.update(ring_edges - selected_edges)
-
-    for new_edge in new_selecte_dges:
-        new_edge.select = True
-
-    bmesh.update_edit_mesh(obj.data)
-
-
-def mio3_select_edge_loop_less(obj):
-    bm = bmesh.from_edit_mesh(obj.data)
-    selected_edges = {e for e in bm.edges if e.select}
+    bm.edges.ensure_lookup_table()
+    topo, selected = get_edge_selection(obj)
+    selected = selected.copy()
 
-    deselect_edges = set()
-    for edge in selected_edges:
-        count_selected = sum(1 for v in edge.verts for e in v.link_edges if e.select)
-        if count_selected <= 3:
-            deselect_edges.add(edge)
+    removed_edges = []
+    for _ in range(steps):
+        deselect_edges = step_func(topo, selected)
+        if not len(deselect_edges):
+            break
+        selected[deselect_edges] = False
+        removed_edges.append(deselect_edges)
 
-    for edge in deselect_edges:
-        edge.select = False
+    if removed_edges:
+        set_edges_select(bm, np.concatenate(removed_edges), False)
 
-    active_element = bm.select_history.active
-    if not (isinstance(active_element, bmesh.types.BMEdge) and active_element.select):
-        bm.select_history.clear()
+    clear_inactive_history(bm)
+    update_edit_mesh(obj.data)
 
-    bmesh.update_edit_mesh(obj.data)
 
+def mio3_select_edge_loop_more(obj, steps=1):
+    mio3_select_edges_more(obj, edge_loop_more_step, steps)
 
-def mio3_select_edge_ring_less(obj):
-    bm = bmesh.from_edit_mesh(obj.data)
-    selected_edges = {e for e in bm.edges if e.select}
-
-    deselect_edges = set()
-    for edge in selected_edges:
-        count_selected_ring = 0
-        for face in edge.link_faces:
-            for face_edge in face.edges:
-                if face_edge.select and face_edge != edge:
-                    count_selected_ring += 1
-                    break
-        if count_selected_ring <= 1:
-            deselect_edges.add(edge)
-
-    for edge in deselect_edges:
-        edge.select = False
 
-    active_element = bm.select_history.active
-    if not (isinstance(active_element, bmesh.types.BMEdge) and active_element.select):
-        bm.select_history.clear()
+def mio3_select_edge_ring_more(obj, steps=1):
+    mio3_select_edges_more(obj, edge_ring_more_step, steps)
+
+
+def mio3_select_edge_loop_less(obj, steps=1):
+    mio3_select_edges_less(obj, edge_loop_less_step, steps)
+
 
-    bmesh.update_edit_mesh(obj.data)
+def mio3_select_edge_ring_less(obj, steps=1):
+    mio3_select_edges_less(obj, edge_ring_less_step, steps)
 
 
 class MESH_OT_mio3_select_edges(Mio3MTOperator):
@@ -120,6 +166,7 @@ class MESH_OT_mio3_select_edges(Mio3MTOperator):
         items=[("MORE", "One More", ""), ("LESS", "One Less", ""), ("EXPAND", "Expand", "")],
         options={"HIDDEN", "SKIP_SAVE"},
     )
+    steps: IntProperty(name="Steps", default=1, min=1, max=100)
 
     def invoke(self, context, event):
         if event.type == "NUMPAD_PLUS":
@@ -131,21 +178,23 @@ class MESH_OT_mio3_select_edges(Mio3MTOperator):
         return self.execute(context)
 
     def execute(self, context):
+        self.start_time()
         obj = context.active_object
         if self.ring:
             if self.mode == "EXPAND":
                 bpy.ops.mesh.loop_multi_select("EXEC_DEFAULT", ring=True)
             elif self.mode == "MORE":
-                mio3_select_edge_ring_more(obj)
+                mio3_select_edge_ring_more(obj, self.steps)
             elif self.mode == "LESS":
-                mio3_select_edge_ring_less(obj)
+                mio3_select_edge_ring_less(obj, self.steps)
         else:
             if self.mode == "EXPAND":
                 bpy.ops.mesh.loop_multi_select("EXEC_DEFAULT", ring=False)
             elif self.mode == "MORE":
-                mio3_select_edge_loop_more(obj)
+                mio3_select_edge_loop_more(obj, self.steps)
             elif self.mode == "LESS":
-                mio3_select_edge_loop_less(obj)
+                mio3_select_edge_loop_less(obj, self.steps)
+        self.print_time()
         return {"FINISHED"}
 
 
@@ -156,79 +205,84 @@ class MESH_OT_mio3_select_between(Mio3MTOperator):
     bl_options = {"REGISTER", "UNDO"}
 
     def execute(self, context):
+        self.start_time()
         obj = context.active_object
-        obj.update_from_editmode()
-
         context.tool_settings.mesh_select_mode = (False, True, False)
 
         bm = bmesh.from_edit_mesh(obj.data)
         bm.edges.ensure_lookup_table()
+        topo, selected = get_edge_selection(obj)
 
-        selected_edges = {e for e in bm.edges if e.select}
-        edge_loops = self.find_connected_edges(selected_edges)
-        if len(edge_loops) < 2:
+        edge_indices = np.flatnonzero(selected)
+        vert_labels = label_connected_components(topo.num_verts, topo.edge_verts[edge_indices])
+        edge_labels = vert_labels[topo.edge_verts[edge_indices, 0]]
+        if len(np.unique(edge_labels)) < 2:
             return {"CANCELLED"}
 
-        self.select_between_loops(edge_loops)
+        between_edges = self.find_between_edges(topo, edge_indices, edge_labels)
+        set_edges_select(bm, between_edges[~selected[between_edges]], True)
 
-        bmesh.update_edit_mesh(obj.data)
+        update_edit_mesh(obj.data)
+        self.print_time()
         return {"FINISHED"}
 
-    def find_connected_edges(self, edges):
-        edge_loops = []
-        ungrouped = set(edges)
-        while ungrouped:
-            current = ungrouped.pop()
-            group = [current]
-            stack = [current]
-            while stack:
-                edge = stack.pop()
-                for vert in edge.verts:
-                    for connected in vert.link_edges:
-                        if connected in ungrouped:
-                            ungrouped.remove(connected)
-                            group.append(connected)
-                            stack.append(connected)
-            edge_loops.append(group)
-        return edge_loops
-
-    def select_between_loops(self, edge_loops):
-        for i in range(len(edge_loops) - 1):
-            start_loop = edge_loops[i]
-            end_loop = edge_loops[i + 1]
-            path_list = self.find_between_edges(start_loop, end_loop)
-            for path in path_list:
-                for edge in path:
-                    edge.select = True
-
-    def find_between_edges(self, start_loop, end_loop):
-        queue = deque([(e, [e]) for e in start_loop])
-        visited = set(start_loop)
-        valid_paths = []
-
-        while queue:
-            current_edge, path = queue.popleft()
-
-            if current_edge in end_loop:
-                if path[0] in start_loop and path[-1] in end_loop:
-                    valid_paths.append(path)
-                continue
-
-            ring_edges = set()
-            for face in current_edge.link_faces:
-                if len(face.edges) == 4:
-                    edges = list(face.edges)
-                    if current_edge in edges:
-                        idx = edges.index(current_edge)
-                        opposite_edge = edges[(idx + 2) % 4]
-                        ring_edges.add(opposite_edge)
-
-            for next_edge in ring_edges:
-                if next_edge not in visited:
-                    visited.add(next_edge)
-                    queue.append((next_edge, path + [next_edge]))
-
-        return valid_paths
+    @staticmethod
+    def find_between_edges(topo, edge_indices, edge_labels):
+        """各ループから同時にリング方向へ探索し、別のループと最短で出会った経路を取得する"""
+        owner = np.full(topo.num_edges, -1, dtype=np.int64)
+        parent = np.full(topo.num_edges, -1, dtype=np.int64)
+        root = np.full(topo.num_edges, -1, dtype=np.int64)
+        depth = np.zeros(topo.num_edges, dtype=np.int64)
+        owner[edge_indices] = edge_labels
+        root[edge_indices] = edge_indices
+
+        meet_a, meet_b = [], []
+        frontier = edge_indices
+        while len(frontier):
+            loops = topo.get_edge_loops(frontier)
+            next_edges = topo.loop_opposite_edge[loops]
+            mask = next_edges >= 0
+            src_edges = topo.loop_edges[loops][mask]
+            next_edges = next_edges[mask]
+
+            unvisited = owner[next_edges] < 0
+            new_edges, first = np.unique(next_edges[unvisited], return_index=True)
+            src_new = src_edges[unvisited][first]
+            owner[new_edges] = owner[src_new]
+            parent[new_edges] = src_new
+            root[new_edges] = root[src_new]
+            depth[new_edges] = depth[src_new] + 1
+
+            meet = owner[next_edges] != owner[src_edges]
+            meet_a.append(src_edges[meet])
+            meet_b.append(next_edges[meet])
+            frontier = new_edges
+
+        path = np.zeros(topo.num_edges, dtype=bool)
+        if not meet_a:
+            return np.flatnonzero(path)
+        meet_a, meet_b = np.concatenate(meet_a), np.concatenate(meet_b)
+        if not len(meet_a):
+            return np.flatnonzero(path)
+
+        # 閉じたリングでは反対側でも出会うので、起点の辺の組ごとに最も近い出会いだけ残す
+        ra, rb = root[meet_a], root[meet_b]
+        pair_keys = np.minimum(ra, rb) * topo.num_edges + np.maximum(ra, rb)
+        _, pair_ids = np.unique(pair_keys, return_inverse=True)
+        pair_ids = pair_ids.reshape(-1)
+        lengths = depth[meet_a] + depth[meet_b]
+        shortest = np.full(pair_ids.max() + 1, lengths.max())
+        np.minimum.at(shortest, pair_ids, lengths)
+        nearest = lengths == shortest[pair_ids]
+
+        # 出会った辺から親をたどって経路を復元
+        current = np.unique(np.concatenate([meet_a[nearest], meet_b[nearest]]))
+        while len(current):
+            current = current[~path[current]]
+            path[current] = True
+            current = parent[current]
+            current = current[current >= 0]
+        return np.flatnonzero(path)
 
 
 class MESH_OT_mio3_select_edge_filter(Mio3MTOperator):
@@ -248,29 +302,31 @@ class MESH_OT_mio3_select_edge_filter(Mio3MTOperator):
     )
 
     def execute(self, context):
+        self.start_time()
         obj = context.active_object
         context.tool_settings.mesh_select_mode = (False, True, False)
         bm = bmesh.from_edit_mesh(obj.data)
         bm.edges.ensure_lookup_table()
 
-        selected_edges = {e for e in bm.edges if e.select}
-
-        deselect_all(bm)
-
-        for edge in selected_edges:
-            v1, v2 = edge.verts
-            edge_vector = v2.co - v1.co
-            selected = False
-            max_component = max(abs(edge_vector.x), abs(edge_vector.y), abs(edge_vector.z))
-            if "X" in self.axis and abs(edge_vector.x) == max_component:
-                selected = True
-            elif "Y" in self.axis and abs(edge_vector.y) == max_component:
-                selected = True
-            elif "Z" in self.axis and abs(edge_vector.z) == max_component:
-                selected = True
-            edge.select = selected
+        obj.update_from_editmode()
+        mesh = obj.data
+        edge_indices = np.flatnonzero(get_select_array(mesh.edges))
+        edge_verts = get_edge_vert_array(mesh)[edge_indices]
+        co = get_vert_co_array(mesh)
+
+        # 最大成分の軸が対象に含まれる辺を残す
+        delta = np.abs(co[edge_verts[:, 1]] - co[edge_verts[:, 0]])
+        dominant = delta == delta.max(axis=1, keepdims=True)
+        axis_mask = np.array([axis in self.axis for axis in "XYZ"])
+        keep = (dominant & axis_mask).any(axis=1)
+
+        set_edges_select(bm, edge_indices[~keep], False)
+        # 解除した辺と共有する頂点の選択を戻す (面の選択は増やさない)
+        set_edges_select(bm, edge_indices[keep], True)
+        bm.select_flush(False)
 
-        bmesh.update_edit_mesh(obj.data)
+        update_edit_mesh(obj.data)
+        self.print_time()
         return {"FINISHED"}
 
 
@@ -314,100 +370,101 @@ class MESH_OT_mio3_select_edge_vector(Mio3MTOperator):
         bm = bmesh.from_edit_mesh(obj.data)
         bm.edges.ensure_lookup_table()
 
+        obj.update_from_editmode()
+        mesh = obj.data
+        edge_indices = np.flatnonzero(get_select_array(mesh.edges))
+        edge_verts = get_edge_vert_array(mesh)[edge_indices]
+        co = get_vert_co_array(mesh).astype(np.float64)
+
         if not armature or self.bone_type == "BOUNDARY":
             self.bone_type = "BOUNDARY"
-            selected_edges = {e for e in bm.edges if e.select}
-            selected_faces = {f for f in bm.faces if f.select}
-            boundary_edges = {e for e in bm.edges if len({f for f in e.link_faces if f in selected_faces}) == 1}
-
-            groups = []
-            remaining = set(boundary_edges)
-            while remaining:
-                current_group = []
-                start_edge = remaining.pop()
-                current_group.append(start_edge)
-                current_vert = start_edge.verts[1]
-
-                while True:
-                    next_edge = next((e for e in current_vert.link_edges if e in remaining), None)
-                    if not next_edge:
-                        break
-                    current_group.append(next_edge)
-                    remaining.remove(next_edge)
-                    current_vert = next_edge.verts[0] if next_edge.verts[1] == current_vert else next_edge.verts[1]
-                groups.append(current_group)
-
-            if len(groups) == 2:
-                centers = []
-                for group in groups:
-                    vertices = set()
-                    for edge in group:
-                        vertices.add(edge.verts[0])
-                        vertices.add(edge.verts[1])
-
-                    center = Vector()
-                    for vert in vertices:
-                        center += vert.co
-                    center /= len(vertices)
-                    centers.append(center)
-
-                direction = (centers[1] - centers[0]).normalized()
-
-                cos_threshold = math.cos(math.radians(self.angle_threshold))
-                for edge in selected_edges:
-                    v1, v2 = edge.verts
-                    edge_vector = v2.co - v1.co
-                    edge_vector.normalize()
-
-                    if self.vartical:
-                        edge.select = abs(edge_vector.dot(direction)) > cos_threshold
-                    else:
-                        edge.select = abs(edge_vector.dot(direction)) < cos_threshold
-            else:
+            direction = self.get_boundary_direction(mesh, co)
+            if direction is None:
                 self.report({"WARNING"}, "Boundary edges are not divided into two groups")
+                directions = np.full((len(edge_indices), 3), np.nan)
+            else:
+                directions = np.broadcast_to(direction, (len(edge_indices), 3))
+        elif self.bone_type == "WEIGHT":
+            directions = self.get_weight_bone_directions(obj, bm, armature, edge_verts)
+        elif self.bone_type == "CLOSEST":
+            directions = self.get_closest_bone_directions(obj, armature, edge_verts, co)
         else:
-            kd = None
-            bone_mapping = []
-            if self.bone_type == "CLOSEST":
-                bone_coords = []
-                for bone in armature.data.bones:
-                    if bone.use_deform and not bone.hide:
-                        head_world = armature.matrix_world @ bone.head_local
-                        tail_world = armature.matrix_world @ bone.tail_local
-                        bone_coords.extend([head_world, tail_world])
-                        bone_mapping.extend([bone, bone])
-                size = len(bone_coords)
-                kd = kdtree.KDTree(size)
-                for i, v in enumerate(bone_coords):
-                    kd.insert(v, i)
-                kd.balance()
-
-            selected_edges = {e for e in bm.edges if e.select}
-            cos_threshold = math.cos(math.radians(self.angle_threshold))
-            for edge in selected_edges:
-                if self.bone_type == "WEIGHT":
-                    bone = get_bone_by_weight(obj, armature, edge.verts)
-                elif self.bone_type == "CLOSEST":
-                    bone = get_bone_by_closest(obj, armature, edge.verts, bone_mapping, kd)
-                else:
-                    bone = armature.data.bones.active
-                if not bone:
-                    continue
-                direction = (bone.tail_local - bone.head_local).normalized()
-                v1, v2 = edge.verts
-                edge_vector = v2.co - v1.co
-                edge_vector.normalize()
-
-                if self.vartical:
-                    edge.select = abs(edge_vector.dot(direction)) > cos_threshold
-                else:
-                    edge.select = abs(edge_vector.dot(direction)) < cos_threshold
+            directions = np.full((len(edge_indices), 3), np.nan)
+            bone = armature.data.bones.active
+            if bone:
+                directions[:] = get_bone_directions([bone])[0]
+
+        edge_vectors = normalize_rows(co[edge_verts[:, 1]] - co[edge_verts[:, 0]])
+        valid = ~np.isnan(directions[:, 0])
+        dots = np.abs(np.einsum("ij,ij->i", edge_vectors[valid], directions[valid]))
+
+        cos_threshold = math.cos(math.radians(self.angle_threshold))
+        if self.vartical:
+            keep = dots > cos_threshold
+        else:
+            keep = dots < cos_threshold
+        set_edges_select(bm, edge_indices[valid][~keep], False)
 
         bm.select_flush(False)
-        bmesh.update_edit_mesh(obj.data)
+        update_edit_mesh(obj.data)
         self.print_time()
         return {"FINISHED"}
 
+    @staticmethod
+    def get_boundary_direction(mesh, co):
+        """選択面の2つの境界の中心を結ぶ向きを取得する"""
+        topo = get_mesh_topology(mesh)
+        face_select = get_select_array(mesh.polygons)
+        selected_loops = face_select[topo.loop_faces]
+        boundary = np.bincount(topo.loop_edges[selected_loops], minlength=topo.num_edges) == 1
+        boundary_verts = topo.edge_verts[boundary]
+
+        vert_labels = label_connected_components(topo.num_verts, boundary_verts)
+        vert_indices = np.unique(boundary_verts)
+        _, groups = np.unique(vert_labels[vert_indices], return_inverse=True)
+        groups = groups.reshape(-1)
+        if len(vert_indices) == 0 or groups.max() != 1:
+            return None
+
+        counts = np.bincount(groups)
+        centers = np.stack([np.bincount(groups, weights=co[vert_indices, i]) for i in range(3)], axis=1)
+        centers /= counts[:, None]
+        return normalize_rows((centers[1] - centers[0])[None])[0]
+
+    @staticmethod
+    def get_weight_bone_directions(obj, bm, armature, edge_verts):
+        """辺ごとにウェイトが最大のボーンの向きを取得する"""
+        bones = get_deform_bones(armature)
+        bone_directions = np.vstack([get_bone_directions(bones), np.full((1, 3), np.nan)])
+
+        vert_indices, edge_rows = np.unique(edge_verts, return_inverse=True)
+        edge_rows = edge_rows.reshape(edge_verts.shape)
+        vert_bone, vert_weight = get_vert_weight_bones(obj, bm, bones, vert_indices)
+
+        weights = vert_weight[edge_rows]
+        edge_bone = np.where(weights[:, 0] >= weights[:, 1], vert_bone[edge_rows[:, 0]], vert_bone[edge_rows[:, 1]])
+        return bone_directions[edge_bone]
+
+    @staticmethod
+    def get_closest_bone_directions(obj, armature, edge_verts, co):
+        """辺ごとに最も近いボーンの向きを取得する"""
+        bones = get_deform_bones(armature)
+        bone_directions = np.vstack([get_bone_directions(bones), np.full((1, 3), np.nan)])
+        if not bones:
+            return bone_directions[np.full(len(edge_verts), -1)]
+
+        heads = transform_points(armature.matrix_world, np.array([b.head_local for b in bones], dtype=np.float64))
+        tails = transform_points(armature.matrix_world, np.array([b.tail_local for b in bones], dtype=np.float64))
+
+        vert_indices, edge_rows = np.unique(edge_verts, return_inverse=True)
+        edge_rows = edge_rows.reshape(edge_verts.shape)
+        vert_world = transform_points(obj.matrix_world, co[vert_indices])
+        vert_bone, vert_dist = get_closest_segments(vert_world, heads, tails)
+
+        dists = vert_dist[edge_rows]
+        edge_bone = np.where(dists[:, 0] <= dists[:, 1], vert_bone[edge_rows[:, 0]], vert_bone[edge_rows[:, 1]])
+        return bone_directions[edge_bone]
+
 
 class MESH_OT_mio3_select_edge_view(Mio3MTOperator):
     bl_idname = "mesh.mio3_select_edge_view"
@@ -426,6 +483,7 @@ class MESH_OT_mio3_select_edge_view(Mio3MTOperator):
     invert: BoolProperty(name="Invert", default=False)
 
     def execute(self, context):
+        self.start_time()
         obj = context.active_object
         context.tool_settings.mesh_select_mode = (False, True, False)
 
@@ -434,60 +492,47 @@ class MESH_OT_mio3_select_edge_view(Mio3MTOperator):
 
         region = context.region
         rv3d = context.space_data.region_3d
-        matrix_world = obj.matrix_world
-
-        view_forward = rv3d.view_rotation @ Vector((0, 0, -1))
-
-        selected_edges = {e for e in bm.edges if e.select}
-        deselect_all(bm)
-
-        for edge in selected_edges:
-            v1, v2 = edge.verts
-
-            v1_co = v1.co.copy()
-            v2_co = v2.co.copy()
+        view_forward = np.array(rv3d.view_rotation @ Vector((0, 0, -1)))
 
-            edge_vector = v2_co - v1_co
-            edge_vector.normalize()
-
-            v1_world = matrix_world @ v1_co
-            v2_world = matrix_world @ v2_co
-
-            edge_vector_world = (v2_world - v1_world).normalized()
-
-            depth_component = abs(edge_vector_world.dot(view_forward))
-
-            v1_screen = view3d_utils.location_3d_to_region_2d(region, rv3d, v1_world)
-            v2_screen = view3d_utils.location_3d_to_region_2d(region, rv3d, v2_world)
-
-            selected = False
-
-            if v1_screen is not None and v2_screen is not None:
-                edge_vector_2d = v2_screen - v1_screen
-                length_2d = edge_vector_2d.length
-
-                if length_2d > 0.001:
-                    edge_vector_2d.normalize()
-
-                    x_abs = abs(edge_vector_2d.x)
-                    y_abs = abs(edge_vector_2d.y)
+        obj.update_from_editmode()
+        mesh = obj.data
+        edge_indices = np.flatnonzero(get_select_array(mesh.edges))
+        edge_verts = get_edge_vert_array(mesh)[edge_indices]
+        world_co = get_world_co(obj)
+
+        # 関係する頂点をまとめてスクリーンに投影
+        vert_indices, edge_rows = np.unique(edge_verts, return_inverse=True)
+        edge_rows = edge_rows.reshape(edge_verts.shape)
+        perspective = np.array(rv3d.perspective_matrix, dtype=np.float64)
+        clip = world_co[vert_indices] @ perspective[:, :3].T + perspective[:, 3]
+        visible = clip[:, 3] > 0.0
+        half_size = np.array((region.width / 2.0, region.height / 2.0))
+        screen_co = half_size + half_size * clip[:, :2] / np.where(visible, clip[:, 3], 1.0)[:, None]
+
+        edge_vector_world = normalize_rows(world_co[edge_verts[:, 1]] - world_co[edge_verts[:, 0]])
+        depth_component = np.abs(edge_vector_world @ view_forward)
+
+        edge_vector_2d = screen_co[edge_rows[:, 1]] - screen_co[edge_rows[:, 0]]
+        length_2d = np.linalg.norm(edge_vector_2d, axis=1)
+        x_abs = np.abs(edge_vector_2d[:, 0])
+        y_abs = np.abs(edge_vector_2d[:, 1])
+        if self.axis == "X":
+            aligned = x_abs >= y_abs
+        else:
+            aligned = y_abs > x_abs
 
-                    if depth_component > 0.7:
-                        selected = True
-                    else:
-                        if self.axis == "X" and x_abs >= y_abs:
-                            selected = True
-                        elif self.axis == "Y" and y_abs > x_abs:
-                            selected = True
-                else:
-                    selected = True
+        selected = (length_2d <= 0.001) | (depth_component > 0.7) | aligned
+        selected &= visible[edge_rows[:, 0]] & visible[edge_rows[:, 1]]
+        if self.invert:
+            selected = ~selected
 
-            if self.invert:
-                edge.select = not selected
-            else:
-                edge.select = selected
+        set_edges_select(bm, edge_indices[~selected], False)
+        # 解除した辺と共有する頂点の選択を戻す (面の選択は増やさない)
+        set_edges_select(bm, edge_indices[selected], True)
+        bm.select_flush(False)
 
-        bmesh.update_edit_mesh(obj.data)
+        update_edit_mesh(obj.data)
+        self.print_time()
         return {"FINISHED"}
 
 
@@ -1,8 +1,10 @@
 import bpy
 import bmesh
-import numpy as np
 from bpy.props import BoolProperty, FloatProperty, EnumProperty
-from ..utils import Mio3MTOperator, deselect_all
+from ..utils import Mio3MTOperator, deselect_all, update_edit_mesh
+from ..globals import lazy_import
+
+np = lazy_import("numpy")
 
 
 class MESH_OT_mio3_select_half(Mio3MTOperator):
@@ -160,7 +162,7 @@ class MESH_OT_mio3_select_center(Mio3MTOperator):
                     v.co[axis_index] = 0
 
         bm.select_flush_mode()
-        bmesh.update_edit_mesh(obj.data)
+        update_edit_mesh(obj.data)
         self.print_time()
         return {"FINISHED"}
 
@@ -190,7 +192,9 @@ class MESH_OT_mio3_select_mirror(Mio3MTOperator):
     extend: BoolProperty(name="Extend", default=True)
 
     def execute(self, context):
+        self.start_time()
         bpy.ops.mesh.select_mirror(axis=self.axis, extend=self.extend)
+        self.print_time()
         return {"FINISHED"}
 
     def draw(self, context):
@@ -217,6 +221,7 @@ class MESH_OT_mio3_select_flat(Mio3MTOperator):
     )
 
     def execute(self, context):
+        self.start_time()
         obj = context.active_object
         if obj.type != "MESH":
             return {"CANCELLED"}
@@ -246,7 +251,8 @@ class MESH_OT_mio3_select_flat(Mio3MTOperator):
                     if face.normal.angle(linked.normal) <= threshold:
                         stack.append(linked)
 
-        bmesh.update_edit_mesh(obj.data)
+        update_edit_mesh(obj.data)
+        self.print_time()
         return {"FINISHED"}
 
 
@@ -1,6 +1,8 @@
 import bpy
 from bpy.types import AddonPreferences
+from bpy.app.translations import pgettext_iface as tt_iface
 from bpy.props import FloatVectorProperty, IntProperty, StringProperty
+from .globals import load_timings
 
 
 class PREFERENCE_mio3me(AddonPreferences):
@@ -67,6 +69,13 @@ class PREFERENCE_mio3me(AddonPreferences):
         col.prop(self, "point_size_selected")
         col.prop(self, "point_size_active")
 
+        box = layout.box()
+        box.label(text="Load Time", icon="TIME")
+        col = box.column(align=True)
+        for key, label in (("import", "Import"), ("register", "Register")):
+            if key in load_timings:
+                col.label(text="{}: {:.1f} ms".format(tt_iface(label), load_timings[key] * 1000))
+
 
 def register():
     bpy.utils.register_class(PREFERENCE_mio3me)
@@ -0,0 +1,285 @@
+"""複数の .blend ファイルにメッシュ操作をまとめて適用する
+
+Usage:
+    python tools/batch.py manifest.json [--workers N] [--blender PATH] [--report PATH]
+
+manifest.json:
+    {
+        "files": ["assets/*.blend"],
+        "operations": [
+            {"op": "normal_symmetrize", "params": {"axis": "POSITIVE_X"}, "select_all": true},
+            {"op": "select_center", "params": {"snap": true}},
+            {"op": "origin_to_active"}
+        ],
+        "objects": ["Body"],
+        "workers": 4,
+        "blender": "/path/to/blender",
+        "save": true,
+        "timeout": 600,
+        "report": "report.json"
+    }
+
+"blender" にはBlenderの実行ファイルか、bpyモジュールで実行する場合は "bpy" を指定する
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+OPERATIONS = {
+    "normal_symmetrize": "mesh.mio3_normal_symmetrize",
+    "select_center": "mesh.mio3_select_center",
+    "select_half": "mesh.mio3_select_half",
+    "origin_to_active": "mesh.mio3_origin_to_active",
+    "edge_length": "mesh.mio3_edge_length",
+    "group_merge": "mesh.mio3_group_merg",
+}
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---------------------------------------------------------------------------
+# ワーカー (Blender内で実行)
+# ---------------------------------------------------------------------------
+
+
+def ensure_registered():
+    """アドオンが有効でなければ親フォルダから読み込んで登録する"""
+    import bpy
+    import importlib
+
+    if hasattr(bpy.types, "MESH_OT_mio3_normal_symmetrize"):
+        return
+    sys.path.insert(0, os.path.dirname(PACKAGE_DIR))
+    importlib.import_module(os.path.basename(PACKAGE_DIR)).register()
+
+
+def get_operator(name):
+    import bpy
+
+    category, op_name = OPERATIONS.get(name, name).split(".")
+    return getattr(getattr(bpy.ops, category), op_name)
+
+
+def run_operations(obj, operations):
+    """オブジェクトに操作を順に適用する (失敗したらエラーを記録してそのオブジェクトの残りを飛ばす)"""
+    import bpy
+
+    results = []
+    view_layer = bpy.context.view_layer
+    try:
+        for other in view_layer.objects:
+            other.select_set(False)
+        obj.select_set(True)
+        view_layer.objects.active = obj
+
+        bpy.ops.object.mode_set(mode="EDIT")
+        for operation in operations:
+            start = time.perf_counter()
+            try:
+                if operation.get("select_all"):
+                    bpy.ops.mesh.select_all(action="SELECT")
+                result = get_operator(operation["op"])(**operation.get("params", {}))
+            except Exception as e:
+                results.append({"op": operation["op"], "error": "{}: {}".format(type(e).__name__, e)})
+                break
+            results.append({"op": operation["op"], "result": sorted(result), "time": time.perf_counter() - start})
+    except Exception as e:
+        results.append({"error": "{}: {}".format(type(e).__name__, e)})
+    finally:
+        if obj.mode == "EDIT":
+            bpy.ops.object.mode_set(mode="OBJECT")
+    return results
+
+
+def run_worker(job_path):
+    import bpy
+
+    with open(job_path, encoding="utf-8") as f:
+        job = json.load(f)
+
+    report = {"file": job["file"], "objects": {}}
+    start = time.perf_counter()
+    try:
+        ensure_registered()
+        bpy.ops.wm.open_mainfile(filepath=job["file"])
+        report["open_time"] = time.perf_counter() - start
+
+        names = job.get("objects")
+        failed_objects = []
+        for obj in list(bpy.context.view_layer.objects):
+            if obj.type != "MESH" or obj.library or (names and obj.name not in names):
+                continue
+            results = run_operations(obj, job["operations"])
+            report["objects"][obj.name] = results
+            if any("error" in r for r in results):
+                failed_objects.append(obj.name)
+
+        # 途中で失敗したオブジェクトがあれば、変更が中途半端なまま元のファイルに上書きしない
+        if job.get("save") and failed_objects:
+            report["save_skipped"] = True
+        elif job.get("save"):
+            save_start = time.perf_counter()
+            bpy.ops.wm.save_mainfile()
+            report["save_time"] = time.perf_counter() - save_start
+        report["ok"] = not failed_objects
+        if failed_objects:
+            report["error"] = "Failed objects: {}".format(", ".join(failed_objects))
+            if report.get("save_skipped"):
+                report["error"] += " (not saved)"
+    except Exception as e:
+        report["ok"] = False
+        report["error"] = "{}: {}".format(type(e).__name__, e)
+    report["time"] = time.perf_counter() - start
+
+    with open(job["result"], "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    return report["ok"]
+
+
+# ---------------------------------------------------------------------------
+# コントローラー
+# ---------------------------------------------------------------------------
+
+
+def load_manifest(path):
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    files = []
+    for pattern in manifest.get("files", []):
+        pattern = os.path.join(base_dir, os.path.expanduser(pattern))
+        files.extend(sorted(glob.glob(pattern, recursive=True)) or [pattern])
+    manifest["files"] = list(dict.fromkeys(os.path.abspath(f) for f in files))
+
+    for operation in manifest.get("operations", []):
+        if operation.get("op") not in OPERATIONS and "." not in operation.get("op", ""):
+            raise ValueError("Unknown operation: {}".format(operation.get("op")))
+    return manifest
+
+
+def get_worker_command(blender, job_path):
+    if blender == "bpy":
+        return [sys.executable, __file__, "--worker", job_path]
+    script = [
+        "-b",
+        "--factory-startup",
+        "--python-exit-code",
+        "1",
+        "--python",
+        __file__,
+        "--",
+        "--worker",
+        job_path,
+    ]
+    return [blender] + script
+
+
+def run_file(manifest, filepath, tmp_dir, index):
+    """1ファイル分のワーカーを起動して結果を受け取る"""
+    job_path = os.path.join(tmp_dir, "job_{}.json".format(index))
+    result_path = os.path.join(tmp_dir, "result_{}.json".format(index))
+    job = {
+        "file": filepath,
+        "operations": manifest["operations"],
+        "objects": manifest.get("objects"),
+        "save": manifest.get("save", False),
+        "result": result_path,
+    }
+    with open(job_path, "w", encoding="utf-8") as f:
+        json.dump(job, f)
+
+    start = time.perf_counter()
+    command = get_worker_command(manifest.get("blender", "blender"), job_path)
+    try:
+        proc = subprocess.run(command, capture_output=True, text=True, timeout=manifest.get("timeout"))
+        returncode, stderr = proc.returncode, proc.stderr
+    except subprocess.TimeoutExpired:
+        returncode, stderr = None, "Timed out"
+    wall_time = time.perf_counter() - start
+
+    if os.path.exists(result_path):
+        with open(result_path, encoding="utf-8") as f:
+            report = json.load(f)
+    else:
+        report = {"file": filepath, "ok": False, "error": (stderr or "").strip()[-2000:] or "No result"}
+    if returncode != 0 and report.get("ok"):
+        report["ok"] = False
+        report["error"] = "Exit code {}".format(returncode)
+    report["wall_time"] = wall_time
+    return report
+
+
+def run_batch(manifest):
+    # 大きいファイルから順に割り当てて、最後に長いジョブが残らないようにする
+    files = sorted(manifest["files"], key=lambda f: os.path.getsize(f) if os.path.exists(f) else 0, reverse=True)
+    workers = max(1, manifest.get("workers") or os.cpu_count() or 1)
+
+    reports = []
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="mio3_batch_") as tmp_dir:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_file, manifest, f, tmp_dir, i) for i, f in enumerate(files)]
+            for future in as_completed(futures):
+                report = future.result()
+                reports.append(report)
+                status = "OK" if report["ok"] else "FAILED"
+                print("[{}] {:.2f}s {}".format(status, report["wall_time"], report["file"]), flush=True)
+                if not report["ok"]:
+                    error_lines = report.get("error", "").strip().splitlines()
+                    print("    {}".format(error_lines[-1] if error_lines else ""), flush=True)
+
+    failed = [r for r in reports if not r["ok"]]
+    return {
+        "total_time": time.perf_counter() - start,
+        "workers": workers,
+        "succeeded": len(reports) - len(failed),
+        "failed": len(failed),
+        "files": sorted(reports, key=lambda r: r["file"]),
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Apply Mio3 Mesh Tools operations to many .blend files")
+    parser.add_argument("manifest", nargs="?", help="Job manifest (JSON)")
+    parser.add_argument("--workers", type=int, help="Number of worker processes")
+    parser.add_argument("--blender", help='Blender executable, or "bpy" to use the bpy module')
+    parser.add_argument("--report", help="Write the JSON report to this path")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return 0 if run_worker(args.worker) else 1
+    if not args.manifest:
+        parser.error("manifest is required")
+
+    manifest = load_manifest(args.manifest)
+    for key in ("workers", "blender", "report"):
+        if getattr(args, key):
+            manifest[key] = getattr(args, key)
+
+    summary = run_batch(manifest)
+    print(
+        "{} succeeded, {} failed in {:.2f}s ({} workers)".format(
+            summary["succeeded"], summary["failed"], summary["total_time"], summary["workers"]
+        )
+    )
+    if manifest.get("report"):
+        with open(manifest["report"], "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    # Blenderから実行されたときは "--" 以降が引数
+    if "--" in sys.argv:
+        argv = sys.argv[sys.argv.index("--") + 1 :]
+    sys.exit(main(argv))
@@ -15,6 +15,23 @@ translation_dict = {
         ("*", "Omit the curve option for instant transformation"): "カーブオプションを省略して即時変形します",
         ("*", "Control Points"): "制御点",
         ("*", "Confirmed"): "確定しました",
+        ("*", "Control Point Placement"): "制御点の配置",
+        ("*", "Even"): "均等",
+        ("*", "Fit"): "フィット",
+        ("*", "Place control points at equal intervals along the edge loop"): "エッジループに沿って制御点を等間隔に配置します",
+        ("*", "Place control points so that the curve follows the original shape"): "カーブが元の形状に沿うように制御点を配置します",
+        ("*", "Vertex Placement"): "頂点の配置",
+        ("*", "Slide"): "スライド",
+        ("*", "Project"): "投影",
+        ("*", "Keep the spacing of vertices along the curve"): "カーブに沿った頂点の間隔を保ちます",
+        ("*", "Move vertices to the nearest point on the curve"): "頂点をカーブ上の最も近い位置に移動します",
+        ("*", "Falloff"): "減衰",
+        ("*", "Falloff Radius"): "減衰の半径",
+        ("*", "Move nearby vertices within this distance along the edges"): "辺に沿ってこの距離内にある周辺の頂点も移動します",
+        ("*", "Snap Target"): "スナップ先",
+        ("*", "Snap control points and the curve onto the surface of this mesh"): "制御点とカーブをこのメッシュの表面にスナップします",
+        ("*", "Restore Last Curve"): "前回のカーブを復元",
+        ("*", "Restore the confirmed curve when the same edge loop is edited again"): "同じエッジループを再び編集するときに確定したカーブを復元します",
 
         ("Operator", "Select Edge More/Less"): "エッジ選択を拡大/縮小",
         ("*", "Expand or reduce the selection of edge loops(rings)\n[Shift] Select All\n[Alt] Reduce by one"): "辺の選択を拡大/縮小します\n[Shift]すべて選択\n[Alt]1つ縮小",
@@ -43,6 +60,10 @@ translation_dict = {
         ("Operator", "Origin → Active"): "原点 → アクティブ",
         ("*", "Move the origin to the active element"): "原点をアクティブ要素に移動します",
         # ("Operator", "Snap to Nearest Vertex"): "近接頂点にスナップ",
+        ("*", "Load Time"): "読み込み時間",
+        ("*", "Performance"): "パフォーマンス",
+        ("*", "Update"): "更新",
+        ("*", "No history"): "履歴はありません",
 
         # GPU GUI
         ("*", "🐻Tips"): "🐻Tips",
@@ -1,6 +1,13 @@
+import heapq
 import time
+import bpy
+import bmesh
+from collections import deque
+from functools import cached_property
 from bpy.types import Operator
-from mathutils import Vector, kdtree
+from .globals import lazy_import
+
+np = lazy_import("numpy")
 
 DEBUG = False
 
@@ -21,16 +28,66 @@ def is_exist_menu(cls, target_function):
     return False
 
 
+# オペレーターごとの実行履歴 {bl_idname: deque}
+operator_history = {}
+HISTORY_SIZE = 5
+
+# update_edit_mesh の累計 [時間, 回数]
+_update_stats = [0.0, 0]
+
+
+def update_edit_mesh(mesh, loop_triangles=True, destructive=True):
+    """bmesh.update_edit_mesh にかかった時間を記録する"""
+    start = time.perf_counter()
+    bmesh.update_edit_mesh(mesh, loop_triangles=loop_triangles, destructive=destructive)
+    _update_stats[0] += time.perf_counter() - start
+    _update_stats[1] += 1
+
+
+def get_element_counts(obj):
+    if obj is None or obj.type != "MESH":
+        return None
+    if obj.mode == "EDIT":
+        bm = bmesh.from_edit_mesh(obj.data)
+        return len(bm.verts), len(bm.edges), len(bm.faces)
+    mesh = obj.data
+    return len(mesh.vertices), len(mesh.edges), len(mesh.polygons)
+
+
 class Mio3MTDebug:
     _start_time = 0
+    _start_update = (0.0, 0)
+    _elapsed_time = 0.0
 
     def start_time(self):
-        if DEBUG:
-            self._start_time = time.time()
+        self._start_time = time.perf_counter()
+        self._start_update = tuple(_update_stats)
+        self._elapsed_time = 0.0
+
+    def pause_time(self):
+        """計測を止める (モーダルで入力を待つ時間を含めない)"""
+        if self._start_time is not None:
+            self._elapsed_time += time.perf_counter() - self._start_time
+            self._start_time = None
+
+    def resume_time(self):
+        if self._start_time is None:
+            self._start_time = time.perf_counter()
 
     def print_time(self):
+        elapsed = self._elapsed_time
+        if self._start_time is not None:
+            elapsed += time.perf_counter() - self._start_time
+        entry = {
+            "label": self.bl_label,
+            "time": elapsed,
+            "update_time": _update_stats[0] - self._start_update[0],
+            "update_count": _update_stats[1] - self._start_update[1],
+            "counts": get_element_counts(bpy.context.active_object),
+        }
+        operator_history.setdefault(self.bl_idname, deque(maxlen=HISTORY_SIZE)).append(entry)
         if DEBUG:
-            print("Time: {}".format(time.time() - self._start_time))
+            print("Time: {}".format(elapsed))
 
     def print(self, msg):
         if DEBUG:
@@ -66,91 +123,377 @@ def deselect_all(bm):
     bm.select_flush(False)
 
 
-def find_x_mirror_verts(bm, selected_verts):
-    kd = kdtree.KDTree(len(bm.verts))
-    for i, v in enumerate(bm.verts):
-        kd.insert(v.co, i)
-    kd.balance()
-
-    mirror_verts = set()
-    for v in selected_verts:
-        mirror_co = v.co.copy()
-        mirror_co.x = -mirror_co.x
-        _, index, dist = kd.find(mirror_co)
-        if dist < 0.0001:
-            mirror_vert = bm.verts[index]
-            if mirror_vert not in selected_verts:
-                mirror_verts.add(mirror_vert)
-
-    return mirror_verts
-
-
-def find_x_mirror_vert_pairs(bm, selected_verts):
-    kd = kdtree.KDTree(len(bm.verts))
-    for i, v in enumerate(bm.verts):
-        kd.insert(v.co, i)
-    kd.balance()
-
-    mirror_verts = {}
-    for v in selected_verts:
-        mirror_co = v.co.copy()
-        mirror_co.x = -mirror_co.x
-        _, index, dist = kd.find(mirror_co)
-        if dist < 0.0001:
-            mirror_vert = bm.verts[index]
-            if mirror_vert not in selected_verts:
-                mirror_verts[v] = mirror_vert
-
-    return mirror_verts
-
-
-def get_connected_vert_groups(selected_verts):
-    groups = []
-    unvisited = set(selected_verts)
-    while unvisited:
-        v0 = unvisited.pop()
-        group = {v0}
-        stack = [v0]
-        while stack:
-            v = stack.pop()
-            for e in v.link_edges:
-                if not e.select:
-                    continue
-                ov = e.other_vert(v)
-                if ov in unvisited:
-                    unvisited.remove(ov)
-                    group.add(ov)
-                    stack.append(ov)
-        groups.append(list(group))
-    return groups
-
-
-def get_bone_by_weight(obj, armature, selected_verts):
-    max_weight = 0
-    result_bone = None
-
-    for vert in selected_verts:
-        mesh_vert = obj.data.vertices[vert.index]
-        for group in mesh_vert.groups:
-            if group.group < len(obj.vertex_groups):
-                weight = group.weight
-                if weight > max_weight:
-                    bone_name = obj.vertex_groups[group.group].name
-                    bone = armature.data.bones.get(bone_name)
-                    if bone and bone.use_deform and not bone.hide:
-                        max_weight = weight
-                        result_bone = bone
-    return result_bone
-
-
-def get_bone_by_closest(obj, armature, selected_verts, bone_mapping, kd):
-    closest_bone = None
-    min_distance = float("inf")
-    for vert in selected_verts:
-        vert_world = obj.matrix_world @ obj.data.vertices[vert.index].co
-        _, idx, dist = kd.find(vert_world)
-        if dist < min_distance:
-            min_distance = dist
-            closest_bone = bone_mapping[idx]
-
-    return closest_bone
+def get_x_mirror_vert_map(co, threshold=0.0001):
+    """X軸で対称な位置にある最も近い頂点番号を取得する (無ければ -1)"""
+    co = np.asarray(co, dtype=np.float64)
+    mirror_co = co * (-1.0, 1.0, 1.0)
+    mirror = np.full(len(co), -1, dtype=np.int64)
+    if not len(co):
+        return mirror
+
+    # 閾値の2倍の格子に分け、近い側の隣接8マスだけを比較する
+    lo = np.minimum(co.min(axis=0), mirror_co.min(axis=0))
+    hi = np.maximum(co.max(axis=0), mirror_co.max(axis=0))
+    cell = max(threshold * 2, (hi - lo).max() / (1 << 20))
+    dims = int((hi - lo).max() / cell) + 3
+
+    def get_keys(cells):
+        return (cells[:, 0] * dims + cells[:, 1]) * dims + cells[:, 2]
+
+    keys = get_keys(((co - lo) // cell).astype(np.int64) + 1)
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+
+    query_pos = (mirror_co - lo) / cell
+    query_cells = query_pos.astype(np.int64) + 1
+    query_order = np.argsort(get_keys(query_cells))
+    query_cells = query_cells[query_order]
+    query_side = np.where(query_pos[query_order] % 1.0 < 0.5, -1, 1)
+    query_co = mirror_co[query_order]
+
+    best = np.full(len(co), threshold)
+    found = np.full(len(co), -1, dtype=np.int64)
+    for offset in np.array(np.meshgrid([0, 1], [0, 1], [0, 1])).T.reshape(-1, 3):
+        query_keys = get_keys(query_cells + query_side * offset)
+        left = np.searchsorted(sorted_keys, query_keys, side="left")
+        right = np.searchsorted(sorted_keys, query_keys, side="right")
+        for i in range(int((right - left).max())):
+            queries = np.flatnonzero(right - left > i)
+            candidates = order[left[queries] + i]
+            dist = np.linalg.norm(co[candidates] - query_co[queries], axis=1)
+            closer = dist < best[queries]
+            best[queries[closer]] = dist[closer]
+            found[queries[closer]] = candidates[closer]
+    mirror[query_order] = found
+    return mirror
+
+
+def get_vert_co_array(mesh):
+    v_len = len(mesh.vertices)
+    co = np.empty(v_len * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    return co.reshape((v_len, 3))
+
+
+def get_edge_vert_array(mesh):
+    e_len = len(mesh.edges)
+    edge_verts = np.empty(e_len * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edge_verts)
+    return edge_verts.reshape((e_len, 2))
+
+
+def get_select_array(elements):
+    select = np.empty(len(elements), dtype=bool)
+    elements.foreach_get("select", select)
+    return select
+
+
+def get_int_array(elements, attr, size=1):
+    array = np.empty(len(elements) * size, dtype=np.int32)
+    elements.foreach_get(attr, array)
+    return array.reshape((-1, size)) if size > 1 else array
+
+
+class MeshTopology:
+    """メッシュの接続情報を配列で保持する"""
+
+    def __init__(self, mesh):
+        self.num_verts = len(mesh.vertices)
+        self.num_edges = len(mesh.edges)
+        self.num_faces = len(mesh.polygons)
+        self.edge_verts = get_edge_vert_array(mesh)
+        self.loop_verts = get_int_array(mesh.loops, "vertex_index")
+        self.loop_edges = get_int_array(mesh.loops, "edge_index")
+        self.face_start = get_int_array(mesh.polygons, "loop_start")
+        self.face_total = get_int_array(mesh.polygons, "loop_total")
+
+    @cached_property
+    def loop_faces(self):
+        return np.repeat(np.arange(self.num_faces), self.face_total)
+
+    @cached_property
+    def loop_next(self):
+        loops = np.arange(len(self.loop_edges))
+        start = self.face_start[self.loop_faces]
+        return start + (loops - start + 1) % self.face_total[self.loop_faces]
+
+    @cached_property
+    def loop_prev(self):
+        loops = np.arange(len(self.loop_edges))
+        start = self.face_start[self.loop_faces]
+        total = self.face_total[self.loop_faces]
+        return start + (loops - start + total - 1) % total
+
+    @cached_property
+    def edge_loops(self):
+        "辺 → ループ (CSR形式の開始位置とループ番号)"
+        counts = np.bincount(self.loop_edges, minlength=self.num_edges)
+        start = np.zeros(self.num_edges + 1, dtype=np.int64)
+        np.cumsum(counts, out=start[1:])
+        return start, np.argsort(self.loop_edges, kind="stable")
+
+    @cached_property
+    def loop_opposite_edge(self):
+        "四角形の向かい側の辺 (四角形以外は -1)"
+        faces = self.loop_faces
+        start = self.face_start[faces]
+        opposite = start + (np.arange(len(faces)) - start + 2) % 4
+        return np.where(self.face_total[faces] == 4, self.loop_edges[np.minimum(opposite, len(faces) - 1)], -1)
+
+    @cached_property
+    def edge_face_count(self):
+        start, _ = self.edge_loops
+        return np.diff(start)
+
+    @cached_property
+    def edge_faces(self):
+        "辺 → 面 (最初の2面、無ければ -1)"
+        start, loops = self.edge_loops
+        count = self.edge_face_count
+        edge_faces = np.full((self.num_edges, 2), -1, dtype=np.int64)
+        for i in range(2):
+            has = count > i
+            edge_faces[has, i] = self.loop_faces[loops[start[:-1][has] + i]]
+        return edge_faces
+
+    def get_edge_loops(self, edges):
+        "指定した辺のループをまとめて取得する"
+        start, loops = self.edge_loops
+        counts = self.edge_face_count[edges]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return loops[np.repeat(start[edges], counts) + offsets]
+
+    @cached_property
+    def vert_edges(self):
+        "頂点 → 辺 (CSR形式の開始位置と辺番号)"
+        counts = np.bincount(self.edge_verts.ravel(), minlength=self.num_verts)
+        start = np.zeros(self.num_verts + 1, dtype=np.int64)
+        np.cumsum(counts, out=start[1:])
+        return start, np.argsort(self.edge_verts.ravel(), kind="stable") // 2
+
+    @cached_property
+    def vert_loops(self):
+        "頂点 → ループ (CSR形式の開始位置とループ番号)"
+        counts = np.bincount(self.loop_verts, minlength=self.num_verts)
+        start = np.zeros(self.num_verts + 1, dtype=np.int64)
+        np.cumsum(counts, out=start[1:])
+        return start, np.argsort(self.loop_verts, kind="stable")
+
+    @cached_property
+    def vert_valence(self):
+        start, _ = self.vert_edges
+        return np.diff(start)
+
+
+def label_connected_components(count, pairs):
+    "ペアでつながる要素に連番のグループ番号を振る"
+    parent = np.arange(count, dtype=np.int64)
+    if count == 0 or len(pairs) == 0:
+        return parent
+    a = pairs[:, 0]
+    b = pairs[:, 1]
+    while True:
+        ra = parent[a]
+        rb = parent[b]
+        diff = ra != rb
+        if not diff.any():
+            break
+        # 大きい根を小さい根へつなぐ
+        np.minimum.at(parent, np.maximum(ra[diff], rb[diff]), np.minimum(ra[diff], rb[diff]))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    _, labels = np.unique(parent, return_inverse=True)
+    return labels.reshape(-1)
+
+
+class EdgeGraph:
+    """辺でつながった頂点の隣接リスト"""
+
+    def __init__(self, num_verts, pairs):
+        flat = pairs.ravel()
+        order = np.argsort(flat, kind="stable")
+        self.degree = np.bincount(flat, minlength=num_verts)
+        start = np.zeros(num_verts + 1, dtype=np.int64)
+        np.cumsum(self.degree, out=start[1:])
+        self._start = start.tolist()
+        self._neighbors = pairs[:, ::-1].ravel()[order].tolist()
+        self._visited = bytearray(num_verts)
+
+    def is_visited(self, v):
+        return bool(self._visited[v])
+
+    def walk(self, v):
+        """未訪問の隣接頂点をたどって頂点を順序付ける"""
+        start, neighbors, visited = self._start, self._neighbors, self._visited
+        path = [v]
+        visited[v] = 1
+        while True:
+            for k in range(start[v], start[v + 1]):
+                if not visited[neighbors[k]]:
+                    v = neighbors[k]
+                    break
+            else:
+                return path
+            visited[v] = 1
+            path.append(v)
+
+
+def get_geodesic_distances(co, edge_verts, sources, radius):
+    """複数の頂点から辺に沿って半径内の距離を求める (頂点番号, 距離, 最も近い起点)"""
+    flat = edge_verts.ravel()
+    order = np.argsort(flat, kind="stable")
+    start = np.zeros(len(co) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat, minlength=len(co)), out=start[1:])
+    lengths = np.linalg.norm(co[edge_verts[:, 0]] - co[edge_verts[:, 1]], axis=1)
+    start = start.tolist()
+    neighbors = edge_verts[:, ::-1].ravel()[order].tolist()
+    weights = np.repeat(lengths, 2)[order].tolist()
+
+    distances = {}
+    owners = {}
+    best = {v: 0.0 for v in sources}
+    heap = [(0.0, v, v) for v in best]
+    heapq.heapify(heap)
+    while heap:
+        d, v, src = heapq.heappop(heap)
+        if v in distances:
+            continue
+        distances[v] = d
+        owners[v] = src
+        for k in range(start[v], start[v + 1]):
+            u = neighbors[k]
+            nd = d + weights[k]
+            if nd <= radius and nd < best.get(u, radius + 1.0) and u not in distances:
+                best[u] = nd
+                heapq.heappush(heap, (nd, u, src))
+
+    count = len(distances)
+    return (
+        np.fromiter(distances.keys(), dtype=np.int64, count=count),
+        np.fromiter(distances.values(), dtype=np.float64, count=count),
+        np.fromiter(owners.values(), dtype=np.int64, count=count),
+    )
+
+
+def get_connected_vert_labels(mesh):
+    """選択辺でつながった選択頂点のグループ番号を取得する"""
+    vert_select = get_select_array(mesh.vertices)
+    edge_verts = get_edge_vert_array(mesh)[get_select_array(mesh.edges)]
+
+    vert_indices = np.flatnonzero(vert_select)
+    local_index = np.full(len(vert_select), -1, dtype=np.int64)
+    local_index[vert_indices] = np.arange(len(vert_indices))
+    pairs = local_index[edge_verts]
+    pairs = pairs[(pairs >= 0).all(axis=1)]
+
+    return vert_indices, label_connected_components(len(vert_indices), pairs)
+
+
+def split_by_labels(values, labels):
+    """グループ番号ごとに値を分ける"""
+    if not len(values):
+        return []
+    order = np.argsort(labels, kind="stable")
+    splits = np.flatnonzero(np.diff(labels[order])) + 1
+    return np.split(values[order], splits)
+
+
+def set_edges_select(bm, edge_indices, select):
+    "辺の選択状態をまとめて書き込む"
+    edges = bm.edges
+    for i in edge_indices.tolist():
+        edges[i].select = select
+
+
+def get_deform_bones(armature):
+    return [bone for bone in armature.data.bones if bone.use_deform and not bone.hide]
+
+
+def get_bone_directions(bones):
+    "ボーンの向きをアーマチュア空間の単位ベクトルで取得する"
+    if not bones:
+        return np.zeros((0, 3), dtype=np.float64)
+    heads = np.array([bone.head_local for bone in bones], dtype=np.float64)
+    tails = np.array([bone.tail_local for bone in bones], dtype=np.float64)
+    return normalize_rows(tails - heads)
+
+
+def normalize_rows(vectors):
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, lengths, out=np.zeros_like(vectors), where=lengths > 0)
+
+
+def get_vert_weight_bones(obj, bm, bones, vert_indices):
+    "頂点ごとに最もウェイトの大きい変形ボーンを取得する"
+    vert_bone = np.full(len(vert_indices), -1, dtype=np.int64)
+    vert_weight = np.zeros(len(vert_indices), dtype=np.float64)
+
+    deform_layer = bm.verts.layers.deform.active
+    if deform_layer is None or not bones:
+        return vert_bone, vert_weight
+
+    # 頂点グループ → ボーン番号
+    bone_index = {bone.name: i for i, bone in enumerate(bones)}
+    group_bone = np.array([bone_index.get(vg.name, -1) for vg in obj.vertex_groups] + [-1], dtype=np.int64)
+
+    # 編集モードのデフォームレイヤーを疎行列(COO)として取り出す
+    rows, groups, weights = [], [], []
+    verts = bm.verts
+    for row, i in enumerate(vert_indices.tolist()):
+        dvert = verts[i][deform_layer]
+        if dvert:
+            rows.extend([row] * len(dvert))
+            groups.extend(dvert.keys())
+            weights.extend(dvert.values())
+    if not rows:
+        return vert_bone, vert_weight
+
+    rows = np.array(rows, dtype=np.int64)
+    groups = np.minimum(np.array(groups, dtype=np.int64), len(group_bone) - 1)
+    weights = np.array(weights, dtype=np.float64)
+    bone_of_entry = group_bone[groups]
+    valid = (bone_of_entry >= 0) & (weights > 0)
+    rows, bone_of_entry, weights = rows[valid], bone_of_entry[valid], weights[valid]
+
+    # 行ごとの最大ウェイト
+    order = np.lexsort((-weights, rows))
+    rows = rows[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    vert_bone[rows[first]] = bone_of_entry[order][first]
+    vert_weight[rows[first]] = weights[order][first]
+    return vert_bone, vert_weight
+
+
+def get_closest_segments(points, heads, tails, block_size=2048):
+    "点ごとに最も近い線分の番号と距離を取得する"
+    segments = tails - heads
+    length_sq = np.einsum("ij,ij->i", segments, segments)
+    inv_length_sq = np.divide(1.0, length_sq, out=np.zeros_like(length_sq), where=length_sq > 0)
+
+    closest = np.full(len(points), -1, dtype=np.int64)
+    distances = np.full(len(points), np.inf)
+    if not len(segments):
+        return closest, distances
+
+    # |p - h - t*s|^2 を行列積で展開して計算する
+    head_sq = np.einsum("ij,ij->i", heads, heads)
+    head_dot = np.einsum("ij,ij->i", heads, segments)
+    for start in range(0, len(points), block_size):
+        block = points[start : start + block_size]
+        point_sq = np.einsum("ij,ij->i", block, block)[:, None]
+        along = block @ segments.T - head_dot
+        t = np.clip(along * inv_length_sq, 0.0, 1.0)
+        dist_sq = point_sq - 2.0 * (block @ heads.T) + head_sq - 2.0 * t * along + t * t * length_sq
+        index = np.argmin(dist_sq, axis=1)
+        closest[start : start + block_size] = index
+        distances[start : start + block_size] = np.sqrt(np.maximum(dist_sq[np.arange(len(index)), index], 0.0))
+    return closest, distances
+
+
+def transform_points(matrix, points):
+    mat = np.array(matrix, dtype=np.float64)
+    return points @ mat[:3, :3].T + mat[:3, 3]